@@ -7,17 +7,36 @@ Supports simple commands and multi-step diagnostic reasoning powered by GPT-4.
 
 # Standard library
 import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
+import queue
+import re
+import sys
+import threading
 import time
 import uuid
-from logging.handlers import RotatingFileHandler
+from collections import OrderedDict, deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Third-party
 import httpx
 import openai
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+try:
+    import orjson  # C JSON encoder/decoder for the per-command hot paths
+except ImportError:  # platforms without orjson wheels fall back to stdlib json
+    orjson = None
+
+try:
+    import h2  # noqa: F401  (httpx's HTTP/2 support; only used for the https OpenAI API)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
 
 # Load configuration
 load_dotenv()
@@ -29,14 +48,47 @@ load_dotenv()
 
 # API Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai.api_key = OPENAI_API_KEY
 MCP_SERVER_URL = "http://localhost:8080/mcp"
 SESSION_ID = "vscode-session"
 
+# Shared HTTP client: keeps connections to the MCP server alive across calls
+# (closed at the end of main()). HTTP/1.1: the server URL is plain http, where
+# httpx never negotiates HTTP/2
+_HTTP = httpx.AsyncClient(
+    base_url=MCP_SERVER_URL,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    timeout=30.0,
+)
+
+# Shared OpenAI client (parse + diagnostic paths), created on first use so a
+# missing API key surfaces as an API error rather than an import failure
+_OAI: AsyncOpenAI | None = None
+
+def _openai_client() -> AsyncOpenAI:
+    global _OAI
+    if _OAI is None:
+        _OAI = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=httpx.AsyncClient(http2=_HTTP2_AVAILABLE))
+    return _OAI
+
 # Diagnostic Mode Settings
 MAX_DIAGNOSTIC_ITERATIONS = 5
 MAX_LLM_CALLS = 20  # Safety limit to prevent runaway costs
 
+# Parse cache: repeated/similar phrasings skip the LLM call entirely
+PARSE_CACHE_MAX_ENTRIES = 256
+# Pass --force-llm to bypass the rule-based parser and always ask the model
+FORCE_LLM_PARSE = "--force-llm" in sys.argv[1:]
+
+
+def json_dumps(obj, indent: bool = False) -> str:
+    """Serializes to a JSON str via orjson when available (UTF-8, no ASCII escaping)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter
+json_loads = orjson.loads if orjson is not None else json.loads
+
 
 # ============================================================================
 # LOGGING SETUP
@@ -45,9 +97,24 @@ logs_dir = os.path.join(os.getcwd(), "logs")
 os.makedirs(logs_dir, exist_ok=True)
 agent_log_path = os.path.join(logs_dir, "agent.log")
 
+class _RedactingQueueHandler(QueueHandler):
+    """Enqueues records without formatting them; dict payloads are redacted
+    (which also snapshots them) so JSON encoding and file I/O happen on the
+    listener thread instead of the event loop."""
+
+    def prepare(self, record):
+        if isinstance(record.msg, dict) and record.msg.get("event") not in _UNREDACTED_EVENTS:
+            record = copy.copy(record)
+            record.msg = redact_dict(record.msg)
+        return record
+
 agent_logger = logging.getLogger("k8s_agent")
 agent_logger.setLevel(logging.INFO)
+_log_queue = queue.SimpleQueue()
+_log_listener = None  # started/stopped by main()
 if not agent_logger.handlers:
+    # Rotation stays in-process; its per-record size check runs on the listener
+    # thread, so the event loop only pays for the enqueue
     handler = RotatingFileHandler(agent_log_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
     class AgentJsonFormatter(logging.Formatter):
         def format(self, record):
@@ -64,12 +131,16 @@ if not agent_logger.handlers:
                     base["message"] = str(msg)
             except Exception:
                 base["message"] = record.getMessage()
-            return json.dumps(base, ensure_ascii=False)
+            return json_dumps(base)
     handler.setFormatter(AgentJsonFormatter())
-    agent_logger.addHandler(handler)
+    _log_listener = QueueListener(_log_queue, handler)
+    agent_logger.addHandler(_RedactingQueueHandler(_log_queue))
 
 # --- Simple redaction helper ---
 SENSITIVE_KEYS = {"openai_api_key", "api_key", "authorization", "token", "password"}
+_SENSITIVE_KEYS_FOLDED = frozenset(map(str.casefold, SENSITIVE_KEYS))
+# Events whose payloads are built from non-secret fields only; logged as-is
+_UNREDACTED_EVENTS = frozenset({"mcp_result"})
 
 def redact_value(val: str) -> str:
     if not isinstance(val, str):
@@ -79,51 +150,76 @@ def redact_value(val: str) -> str:
     return val[:4] + "***" + val[-4:]
 
 def redact_dict(d: dict) -> dict:
-    try:
-        red = {}
-        for k, v in d.items():
-            lk = str(k).lower()
-            if lk in SENSITIVE_KEYS:
-                red[k] = redact_value(str(v))
-            elif isinstance(v, dict):
-                red[k] = redact_dict(v)
-            elif isinstance(v, list):
-                red[k] = [redact_dict(x) if isinstance(x, dict) else x for x in v]
-            else:
-                red[k] = v
-        return red
-    except Exception:
+    """Returns a copy of d with sensitive values masked. Nested plain dicts and
+    lists are walked iteratively (no recursion) and copied along the way."""
+    if type(d) is not dict:
         return d
+    sensitive = _SENSITIVE_KEYS_FOLDED
+    red = {}
+    pending = deque([(d, red)])
+    while pending:
+        src, dst = pending.popleft()
+        is_dict = type(src) is dict
+        for k, v in (src.items() if is_dict else enumerate(src)):
+            if is_dict and (k.casefold() if type(k) is str else str(k).casefold()) in sensitive:
+                dst[k] = redact_value(str(v))
+                continue
+            vt = type(v)
+            if vt is dict:
+                child = {}
+            elif vt is list:
+                child = [None] * len(v)
+            else:
+                dst[k] = v
+                continue
+            dst[k] = child
+            pending.append((v, child))
+    return red
 
 # Fetch available instructions from the MCP server
-async def get_instructions_from_server() -> dict | None:
-    instructions_url = f"{MCP_SERVER_URL}/instructions"
-    print(f"🤖 Fetching available commands from {instructions_url}...")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(instructions_url)
-            if response.status_code == 200:
-                instructions = response.json()["instructions"]
-                print(f"✅ Found {len(instructions)} available commands.")
-                return instructions
-            else:
-                print(f"❌ Error fetching commands: {response.text}")
-                return None
-        except httpx.RequestError:
-            print(f"❌ Could not connect to MCP Server at {instructions_url}.")
-            print("Please make sure the server is running.")
-            return None
+async def _fetch_instructions() -> tuple[dict | None, str | None]:
+    """Fetches the instruction registry without printing; returns (instructions, error message)."""
+    try:
+        response = await _HTTP.get("/instructions")
+    except httpx.RequestError:
+        return None, (
+            f"❌ Could not connect to MCP Server at {MCP_SERVER_URL}/instructions.\n"
+            "Please make sure the server is running."
+        )
+    if response.status_code == 200:
+        return json_loads(response.content)["instructions"], None
+    return None, f"❌ Error fetching commands: {response.text}"
 
-# Generates the prompt template dynamically based on the available instructions
-def get_prompt_template(instructions: list) -> str:
-    # Use [INSTRUCTIONS] as a placeholder to avoid conflicts with JSON braces.
-    template = """
+async def get_instructions_from_server(fetch: asyncio.Task | None = None) -> dict | None:
+    """Reports on the instruction fetch, awaiting an already-started fetch task when given."""
+    print(f"🤖 Fetching available commands from {MCP_SERVER_URL}/instructions...")
+    instructions, error = await (fetch if fetch is not None else _fetch_instructions())
+    if error:
+        print(error)
+        return None
+    print(f"✅ Found {len(instructions)} available commands.")
+    return instructions
+
+def _format_instruction(name: str, details) -> str:
+    """Renders one instruction as a compact signature, e.g. 'get_events(namespace='default')'."""
+    args = (details or {}).get("arguments") if isinstance(details, dict) else None
+    if not args:
+        return f"- {name}()"
+    rendered = [k if str(v).upper() == "REQUIRED" else f"{k}={v!r}" for k, v in args.items()]
+    return f"- {name}({', '.join(rendered)})"
+
+# Parse prompt. [INSTRUCTIONS] and [MESSAGE] are placeholders (not str.format fields) to
+# avoid conflicts with JSON braces; the template is split around them once, up front.
+PARSE_PROMPT_TEMPLATE = """
 You're a command parser for Kubernetes.
 
 Given a user message, convert it to a JSON object with:
-- `instruction`: one of [INSTRUCTIONS]
+- `instruction`: one of the instruction names listed below
 - `params`: a dictionary of parameters for the instruction.
 
+Instructions (required args first, optional args show their default):
+[INSTRUCTIONS]
+
 Return **only the JSON** object.
 
 General rules:
@@ -170,25 +266,50 @@ User message: "describe the deployment 'my-deployment'"
 
 User message: "[MESSAGE]"
 """
-    return template.replace("[INSTRUCTIONS]", str(instructions))
+_PROMPT_HEAD, _PROMPT_TAIL = PARSE_PROMPT_TEMPLATE.split("[INSTRUCTIONS]", 1)
+
+# Generates the prompt template dynamically based on the available instructions
+def get_prompt_template(instructions: dict) -> tuple[str, str]:
+    """Returns the rendered prompt as (prefix, suffix) around the [MESSAGE] placeholder.
+    Rendered once at startup so each parse is a plain concatenation."""
+    instructions_block = "\n".join(_format_instruction(name, details) for name, details in instructions.items())
+    prefix, suffix = f"{_PROMPT_HEAD}{instructions_block}{_PROMPT_TAIL}".split("[MESSAGE]", 1)
+    return prefix, suffix
 
 # --- Helper: interactively fill missing required params (minimal, user-friendly) ---
-def fill_missing_required_params(command_json: dict, instructions_schema: dict) -> tuple[dict, bool]:
+class InstructionsIndex:
+    """Lookups derived once from the /instructions payload: the required argument
+    names per instruction and the OpenAI tool schemas built from them."""
+
+    def __init__(self, instructions: dict):
+        self.instructions = instructions
+        self.required: dict[str, tuple[str, ...]] = {
+            name: tuple(k for k, v in (details.get("arguments") or {}).items() if str(v).upper() == "REQUIRED")
+            for name, details in instructions.items()
+        }
+        self._tool_schemas = None
+
+    def tool_schemas(self) -> list:
+        if self._tool_schemas is None:
+            self._tool_schemas = build_tool_schemas(self)
+        return self._tool_schemas
+
+
+async def fill_missing_required_params(command_json: dict, index: InstructionsIndex) -> tuple[dict, bool]:
     """Returns (updated_command_json, cancelled). Prompts user for missing required params.
     For 'namespace', suggests 'default' when missing.
     """
     try:
         inst = (command_json or {}).get("instruction")
         params = (command_json or {}).get("params") or {}
-        tool = (instructions_schema or {}).get(inst) or {}
-        args = (tool or {}).get("arguments") or {}
-        missing = [k for k, v in args.items() if str(v).upper() == "REQUIRED" and k not in params]
-        for key in missing:
+        for key in index.required.get(inst, ()):
+            if key in params:
+                continue
             if key == "namespace":
-                answer = input("No namespace provided. Press Enter to use 'default' or type a namespace: ").strip()
+                answer = (await ainput("No namespace provided. Press Enter to use 'default' or type a namespace: ")).strip()
                 params["namespace"] = answer if answer else "default"
             else:
-                answer = input(f"Missing required parameter '{key}'. Please provide a value (or press Enter to cancel): ").strip()
+                answer = (await ainput(f"Missing required parameter '{key}'. Please provide a value (or press Enter to cancel): ")).strip()
                 if not answer:
                     print("⚠️ Cancelled due to missing required parameter.")
                     return command_json, True
@@ -199,66 +320,250 @@ def fill_missing_required_params(command_json: dict, instructions_schema: dict)
         # On any error, don't block execution; proceed without changes
         return command_json, False
 
+# --- Parsed-command cache ---
+# Maps a normalized message (resource names replaced by <nameN> placeholders) to a
+# template of the parsed command, so "describe pod 'a-1'" and "Describe pod 'b-2'." share an entry.
+# A template is (instruction, {param: ("name", index) | ("literal", value)}); only whole
+# param values are substituted, never keys, the instruction name or parts of other values.
+_parse_cache: "OrderedDict[str, tuple[str, dict]]" = OrderedDict()
+_QUOTED_RE = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+_IDENTIFIER_RE = re.compile(r"\b[a-z0-9]+(?:[-.][a-z0-9]+)+\b")
+_PUNCT_RE = re.compile(r"[^\w<>\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+def _normalize_message(message: str) -> tuple[str, list[str]]:
+    """Returns (cache_key, identifiers). Identifiers are the quoted values and
+    dashed/dotted resource names, replaced in the key by <name0>, <name1>, ...
+    """
+    identifiers: list[str] = []
+
+    def _placeholder(match: re.Match) -> str:
+        identifiers.append(next((g for g in match.groups() if g), match.group(0)))
+        return f" <name{len(identifiers) - 1}> "
+
+    text = _QUOTED_RE.sub(_placeholder, message)
+    text = _IDENTIFIER_RE.sub(_placeholder, text).lower()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip(), identifiers
+
+def _parse_cache_get(key: str, identifiers: list[str]) -> dict | None:
+    template = _parse_cache.get(key)
+    if template is None:
+        return None
+    _parse_cache.move_to_end(key)
+    instruction, slots = template
+    params = {}
+    for name, (source, value) in slots.items():
+        params[name] = identifiers[value] if source == "name" else value
+    return {"instruction": instruction, "params": params}
+
+def _parse_cache_put(key: str, identifiers: list[str], command_json: dict) -> None:
+    """Caches a parse only when every param value is accounted for: either exactly one of
+    the message's identifiers, or a literal that the cache key itself pins down (a word
+    of the key, or a bool flag implied by its wording)."""
+    instruction = command_json.get("instruction")
+    params = command_json.get("params")
+    if set(command_json) != {"instruction", "params"} or not isinstance(instruction, str) or not isinstance(params, dict):
+        return
+    words = set(key.split())
+    for value in identifiers:
+        # An identifier that is also a key word, param name or the instruction is ambiguous:
+        # the same text could have come from the fixed part of the message
+        if value.lower() in words or value in params or value == instruction:
+            return
+    slots = {}
+    used = set()
+    for name, value in params.items():
+        if isinstance(value, str) and value in identifiers:
+            index = identifiers.index(value)
+            slots[name] = ("name", index)
+            used.add(index)
+        elif isinstance(value, bool) or (isinstance(value, (str, int)) and str(value) in words):
+            slots[name] = ("literal", value)
+        else:
+            # A value the key doesn't determine (defaulted, reworded or case-folded)
+            return
+    if len(used) != len(identifiers):
+        # The parse didn't echo every identifier back; a template would be ambiguous
+        return
+    _parse_cache[key] = (instruction, slots)
+    _parse_cache.move_to_end(key)
+    while len(_parse_cache) > PARSE_CACHE_MAX_ENTRIES:
+        _parse_cache.popitem(last=False)
+
+def evict_parsed_command(message: str) -> None:
+    """Drops the cached parse for a message (e.g., when executing it failed)."""
+    _parse_cache.pop(_normalize_message(message)[0], None)
+
+# --- Rule-based fast path for simple list/get/describe/logs/events commands ---
+_RESOURCE_PATTERN = (
+    r"(?P<rt>pods?|deployments?|services?|svc|nodes?|namespaces?|ns|configmaps?|cm|hpa"
+    r"|jobs?|cronjobs?|statefulsets?|daemonsets?|ingress(?:es)?|endpoints?|secrets?|pvc|pv)"
+)
+_NAME_PATTERN = r"['\"]?(?P<name>[a-z0-9][-a-z0-9.]*)['\"]?"
+# Words that can sit before "namespace" without naming one ("in my namespace"); those
+# messages fall through to the LLM instead of running against a namespace called "my"
+_NOT_A_NAMESPACE = r"the|a|an|any|my|our|your|their|its|this|that|these|those|current|every|each|which|some|namespace"
+_NS_PATTERN = (
+    r"(?:\s+(?:in|from)\s+(?:the\s+)?(?:(?P<all>all)\s+namespaces?"
+    rf"|(?:namespace\s+)?(?!(?:{_NOT_A_NAMESPACE})\b)(?P<ns>[a-z0-9][-a-z0-9]*)(?:\s+namespace)?))?"
+)
+_LIST_RE = re.compile(rf"(?:list|get|show)(?:\s+me)?(?:\s+all)?(?:\s+the)?\s+{_RESOURCE_PATTERN}{_NS_PATTERN}")
+_DESCRIBE_RE = re.compile(rf"describe\s+(?:the\s+)?{_RESOURCE_PATTERN}\s+(?:named\s+)?{_NAME_PATTERN}{_NS_PATTERN}")
+_LOGS_RE = re.compile(rf"(?:(?:show|get)\s+(?:the\s+)?)?logs?\s+(?:of|for)\s+(?:the\s+)?(?:pod\s+)?{_NAME_PATTERN}{_NS_PATTERN}")
+_EVENTS_RE = re.compile(rf"(?:(?:list|get|show)\s+)?(?:the\s+)?(?:recent\s+)?events{_NS_PATTERN}")
+
+def _rule_based_parse(message: str) -> dict | None:
+    """Parses common command shapes without the LLM. Returns None when unsure."""
+    text = _SPACE_RE.sub(" ", message.strip().lower()).rstrip("?.!")
+    m = _EVENTS_RE.fullmatch(text)
+    if m:
+        return {"instruction": "get_events", "params": {"namespace": "all" if m["all"] else (m["ns"] or "default")}}
+    m = _LIST_RE.fullmatch(text)
+    if m:
+        params = {"resource_type": m["rt"]}
+        if m["all"]:
+            params["all_namespaces"] = True
+        else:
+            params["namespace"] = m["ns"] or "default"
+        return {"instruction": "get_resources", "params": params}
+    m = _DESCRIBE_RE.fullmatch(text)
+    if m and not m["all"]:
+        return {
+            "instruction": "describe_resource",
+            "params": {"resource_type": m["rt"], "resource_name": m["name"], "namespace": m["ns"] or "default"},
+        }
+    m = _LOGS_RE.fullmatch(text)
+    if m and not m["all"]:
+        return {"instruction": "get_pod_logs", "params": {"pod_name": m["name"], "namespace": m["ns"] or "default"}}
+    return None
+
+class _JsonObjectScanner:
+    """Incrementally tracks brace depth (ignoring braces inside string literals)
+    to detect when the first top-level JSON object in a stream is complete."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.start = -1
+        self.end = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Appends text; returns True once the object has been closed."""
+        offset = len(self.buffer)
+        self.buffer += text
+        for i, ch in enumerate(text, offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self.start >= 0:
+                self._in_string = True
+            elif ch == "{":
+                if self.start < 0:
+                    self.start = i
+                self._depth += 1
+            elif ch == "}" and self.start >= 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = i + 1
+                    return True
+        return False
+
+    def result(self) -> str:
+        if self.end > 0:
+            return self.buffer[self.start:self.end]
+        return self.buffer.strip()
+
 # Ask ChatGPT to parse natural language
-async def parse_nl_to_command(message: str, prompt_template: str) -> dict | None:
-    # Use .replace() for safety, avoiding conflicts with braces in the prompt.
-    prompt = prompt_template.replace("[MESSAGE]", message)
-    response = await openai.ChatCompletion.acreate(
-        model="gpt-4o",  # or gpt-4-turbo / gpt-3.5-turbo
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-        max_tokens=150,
-    )
-    raw_output = response.choices[0].message.content.strip()
-
-    # Remove markdown code block backticks if present
-    if raw_output.startswith("```") and raw_output.endswith("```"):
-        lines = raw_output.splitlines()
-        # A bit more robust way to remove ```json ... ```
-        if lines[0].strip().startswith("```"):
-            lines = lines[1:]
-        if lines[-1].strip() == "```":
-            lines = lines[:-1]
-        raw_output = "\n".join(lines).strip()
+async def parse_nl_to_command(message: str, prompt_template: tuple[str, str]) -> dict | None:
+    if not FORCE_LLM_PARSE:
+        command_json = _rule_based_parse(message)
+        if command_json is not None:
+            return command_json
+
+    cache_key, identifiers = _normalize_message(message)
+    cached = _parse_cache_get(cache_key, identifiers)
+    if cached is not None:
+        return cached
 
+    prefix, suffix = prompt_template
+    prompt = f"{prefix}{message}{suffix}"
+    request = {
+        "model": "gpt-4o",  # or gpt-4-turbo / gpt-3.5-turbo
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0,
+        "max_tokens": 150,
+        "stream": True,
+    }
+    client = _openai_client()
     try:
-        return json.loads(raw_output)
+        response = await client.chat.completions.create(**request, response_format={"type": "json_object"})
+    except openai.BadRequestError:
+        # Model without JSON mode: the scanner below still skips any ```json fence
+        response = await client.chat.completions.create(**request)
+
+    # Stop reading as soon as the first top-level JSON object is closed
+    scanner = _JsonObjectScanner()
+    async for chunk in response:
+        if chunk.choices and scanner.feed(chunk.choices[0].delta.content or ""):
+            break
+    await response.close()
+    raw_output = scanner.result()
+
+    try:
+        command_json = json_loads(raw_output)
     except json.JSONDecodeError:
         print("⚠️ Failed to parse response from ChatGPT:")
         print(raw_output)
         return None
+    if isinstance(command_json, dict):
+        _parse_cache_put(cache_key, identifiers, command_json)
+    return command_json
+
+def _attach_request_id(command_json: dict, request_id: str) -> None:
+    """Puts request_id into the command params so server logs carry the same id.
+
+    Params the LLM returned in some other shape (e.g. a list) are left for the
+    server to reject rather than crashing the REPL here.
+    """
+    params = command_json.get("params") or {}
+    if isinstance(params, dict):
+        params["request_id"] = request_id
+        command_json["params"] = params
 
 # Send parsed command to MCP Server
 async def call_mcp_server(command_json: dict):
     execute_url = f"{MCP_SERVER_URL}/execute"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(execute_url, json=command_json, params={"session_id": SESSION_ID}, timeout=30.0)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"❌ An unexpected error occurred with the MCP Server: {response.status_code} {response.text}")
-                return None
-        except httpx.RequestError:
-            print(f"❌ Could not connect to MCP Server at {execute_url}.")
+    try:
+        response = await _HTTP.post("/execute", json=command_json, params={"session_id": SESSION_ID})
+        if response.status_code == 200:
+            # Parse the body bytes directly; response.json() would decode to str first
+            return json_loads(response.content)
+        else:
+            print(f"❌ An unexpected error occurred with the MCP Server: {response.status_code} {response.text}")
             return None
+    except httpx.RequestError:
+        print(f"❌ Could not connect to MCP Server at {execute_url}.")
+        return None
 
 
 # --- Chain-of-thought diagnostic mode ---
 
-def build_tool_schemas(instructions: dict) -> list:
+def build_tool_schemas(index: InstructionsIndex) -> list:
     """Convert MCP server instructions into OpenAI function schemas."""
     tools = []
-    for name, details in instructions.items():
-        params_props = {}
-        required_params = []
-        args = details.get("arguments", {})
-        for arg_name, arg_default in args.items():
-            # Basic type inference (all strings for simplicity; OpenAI is flexible)
-            params_props[arg_name] = {"type": "string", "description": f"Parameter {arg_name}"}
-            if str(arg_default).upper() == "REQUIRED":
-                required_params.append(arg_name)
-        
+    for name, details in index.instructions.items():
+        # Basic type inference (all strings for simplicity; OpenAI is flexible)
+        params_props = {
+            arg_name: {"type": "string", "description": f"Parameter {arg_name}"}
+            for arg_name in details.get("arguments", {})
+        }
         tool_schema = {
             "type": "function",
             "function": {
@@ -267,7 +572,7 @@ def build_tool_schemas(instructions: dict) -> list:
                 "parameters": {
                     "type": "object",
                     "properties": params_props,
-                    "required": required_params,
+                    "required": list(index.required[name]),
                 },
             },
         }
@@ -275,18 +580,89 @@ def build_tool_schemas(instructions: dict) -> list:
     return tools
 
 
-async def run_diagnostic_loop(user_question: str, instructions: dict):
-    """
-    Multi-turn reasoning loop: LLM decides which tools to call, interprets results, and provides final answer.
-    Safety: max 5 reasoning iterations, max 20 total LLM calls to prevent runaway loops and control costs.
-    """
-    print("\n🔍 Diagnostic mode activated. Analyzing your question...\n")
-    
-    tools = build_tool_schemas(instructions)
-    request_id = str(uuid.uuid4())
-    
-    # System prompt for diagnostic mode
-    system_prompt = """You are a Kubernetes diagnostic assistant.
+# --- Tool-result shaping (keeps what the LLM sees small) ---
+
+def _truncate_bytes(text: str, limit: int) -> str:
+    """Cuts text to at most `limit` UTF-8 bytes, dropping any split character."""
+    data = text.encode("utf-8", "replace")
+    if len(data) <= limit:
+        return text
+    return data[:limit].decode("utf-8", "ignore")
+
+
+def _truncate_head_tail(text: str, head: int, tail: int) -> str:
+    """Keeps the first `head` and last `tail` UTF-8 bytes of text."""
+    data = text.encode("utf-8", "replace")
+    if len(data) <= head + tail:
+        return text
+    return (
+        data[:head].decode("utf-8", "ignore")
+        + "\n...[truncated]...\n"
+        + data[-tail:].decode("utf-8", "ignore")
+    )
+
+
+_STATUS_COUNTS = ("replicas", "readyReplicas", "availableReplicas", "unavailableReplicas")
+_STATE_DETAIL = ("reason", "message", "exitCode")
+
+
+def _container_states(status: dict) -> list:
+    """Per-container readiness, restarts and waiting/terminated reasons of a pod status."""
+    containers = []
+    for cs in (status.get("initContainerStatuses") or []) + (status.get("containerStatuses") or []):
+        if not isinstance(cs, dict):
+            continue
+        entry = {"name": cs.get("name"), "ready": cs.get("ready"), "restartCount": cs.get("restartCount", 0)}
+        for key in ("state", "lastState"):
+            for state, detail in (cs.get(key) or {}).items():
+                detail = detail if isinstance(detail, dict) else {}
+                entry[key] = {state: {k: detail[k] for k in _STATE_DETAIL if k in detail}}
+        containers.append(entry)
+    return containers
+
+
+def _shrink_kubectl_object(obj: dict) -> dict:
+    meta = obj.get("metadata") or {}
+    status = obj.get("status") or {}
+    entry = {"kind": obj.get("kind"), "name": meta.get("name"), "namespace": meta.get("namespace")}
+    if not isinstance(status, dict):
+        return entry
+    for key in ("phase", "reason", "message"):
+        if status.get(key):
+            entry[key] = status[key]
+    for key in _STATUS_COUNTS:
+        if key in status:
+            entry[key] = status[key]
+    containers = _container_states(status)
+    if containers:
+        entry["containers"] = containers
+    return entry
+
+
+def _shrink_kubectl_json(text: str) -> str:
+    """For `kubectl ... -o json` output, keep identity and status fields per object
+    (phase, replica counts, per-container state and reasons). Anything that isn't a
+    Kubernetes object or List comes back unchanged."""
+    if not text.startswith("{"):
+        return text
+    try:
+        data = json_loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return text
+    if not isinstance(data, dict) or not isinstance(data.get("kind"), str):
+        return text
+    if isinstance(data.get("items"), list):
+        items = data["items"]
+    elif isinstance(data.get("metadata"), dict):
+        items = [data]
+    else:
+        return text
+    return json_dumps([_shrink_kubectl_object(obj) for obj in items if isinstance(obj, dict)])
+
+
+# System prompt for diagnostic mode. Kept byte-identical across calls so the API's
+# automatic prompt caching can reuse the system + tools prefix.
+DIAGNOSTIC_SYSTEM_PROMPT = """You are a Kubernetes diagnostic assistant.
 The user will ask a question about their cluster (e.g., "are my pods healthy?" or "how do I deploy nginx with autoscale?").
 
 Your job:
@@ -300,8 +676,25 @@ For planning questions: outline the steps (e.g., "create deployment → expose s
 
 Keep your final answer brief and actionable."""
 
+
+def _tool_call_signature(tool_calls) -> bytes:
+    """Digest of the (name, arguments) pairs of one step, used to spot repeated calls."""
+    pairs = [(tc.function.name, tc.function.arguments) for tc in tool_calls]
+    return hashlib.blake2b(json.dumps(pairs).encode(), digest_size=16).digest()
+
+
+async def run_diagnostic_loop(user_question: str, index: InstructionsIndex):
+    """
+    Multi-turn reasoning loop: LLM decides which tools to call, interprets results, and provides final answer.
+    Safety: max 5 reasoning iterations, max 20 total LLM calls to prevent runaway loops and control costs.
+    """
+    print("\n🔍 Diagnostic mode activated. Analyzing your question...\n")
+    
+    tools = index.tool_schemas()
+    request_id = str(uuid.uuid4())
+
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": DIAGNOSTIC_SYSTEM_PROMPT},
         {"role": "user", "content": user_question},
     ]
     
@@ -309,6 +702,8 @@ Keep your final answer brief and actionable."""
     max_llm_calls = 20  # Safety limit to prevent infinite loops and control costs
     iteration = 0
     llm_call_count = 0
+    tool_choice = "auto"
+    recent_signatures = deque(maxlen=2)
     
     while iteration < max_iterations:
         iteration += 1
@@ -329,11 +724,11 @@ Keep your final answer brief and actionable."""
         print(f"💭 Reasoning step {iteration}...")
         
         try:
-            response = await openai.ChatCompletion.acreate(
+            response = await _openai_client().chat.completions.create(
                 model="gpt-4o",
                 messages=messages,
                 tools=tools,
-                tool_choice="auto",
+                tool_choice=tool_choice,
                 temperature=0,
             )
         except Exception as e:
@@ -341,11 +736,11 @@ Keep your final answer brief and actionable."""
             return
         
         message = response.choices[0].message
-        messages.append(message.to_dict())
+        messages.append(message.model_dump(exclude_none=True))
         
         # If no tool calls, the LLM has provided a final answer
-        if not message.get("tool_calls"):
-            final_answer = message.get("content", "")
+        if not message.tool_calls:
+            final_answer = message.content or ""
             print("\n✅ Diagnostic complete.\n")
             print("📋 **Analysis & Recommendations:**")
             print(final_answer)
@@ -357,11 +752,36 @@ Keep your final answer brief and actionable."""
             })
             return
         
-        # Execute each tool call
+        # Same tool calls as a recent step: the model is stuck, so don't re-run them
+        # and force a final answer on the next call instead
+        signature = _tool_call_signature(message.tool_calls)
+        if signature in recent_signatures:
+            agent_logger.warning({
+                "event": "diagnostic_repeated_tool_calls",
+                "request_id": request_id,
+                "llm_calls": llm_call_count,
+                "iterations": iteration,
+            })
+            for tool_call in message.tool_calls:
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": json_dumps({"error": "Duplicate call, result unchanged"}),
+                })
+            messages.append({
+                "role": "system",
+                "content": "You already called this. Summarize your findings with the data you have.",
+            })
+            tool_choice = "none"
+            continue
+        recent_signatures.append(signature)
+
+        # Execute the tool calls concurrently (they are independent MCP requests)
+        calls = []
         for tool_call in message.tool_calls:
             func_name = tool_call.function.name
             try:
-                func_args = json.loads(tool_call.function.arguments)
+                func_args = json_loads(tool_call.function.arguments)
             except json.JSONDecodeError:
                 func_args = {}
             
@@ -372,22 +792,25 @@ Keep your final answer brief and actionable."""
                 "instruction": func_name,
                 "params": func_args,
             }
-            # Attach request_id
-            command_json["params"]["request_id"] = request_id
-            
-            result = await call_mcp_server(command_json)
-            
+            _attach_request_id(command_json, request_id)
+            calls.append(call_mcp_server(command_json))
+
+        results = await asyncio.gather(*calls, return_exceptions=True)
+
+        # Tool results must follow the tool_calls order in the conversation
+        for tool_call, result in zip(message.tool_calls, results):
             # Format result for LLM (include summary if available, else stdout/stderr)
-            if result:
+            if result and not isinstance(result, BaseException):
                 tool_result = {
                     "returncode": result.get("returncode", -1),
                 }
                 if result.get("summary"):
                     tool_result["summary"] = result["summary"]
                 elif result.get("stdout"):
-                    tool_result["stdout"] = result["stdout"][:2000]  # Truncate for token limits
+                    # Truncate for token limits (keep the tail: errors/totals usually end the output)
+                    tool_result["stdout"] = _truncate_head_tail(_shrink_kubectl_json(result["stdout"]), 1500, 500)
                 if result.get("stderr"):
-                    tool_result["stderr"] = result["stderr"][:500]
+                    tool_result["stderr"] = _truncate_bytes(result["stderr"], 500)
             else:
                 tool_result = {"error": "Failed to execute command"}
             
@@ -395,7 +818,7 @@ Keep your final answer brief and actionable."""
             messages.append({
                 "role": "tool",
                 "tool_call_id": tool_call.id,
-                "content": json.dumps(tool_result, ensure_ascii=False),
+                "content": json_dumps(tool_result),
             })
     
     print("\n⚠️ Reached maximum reasoning iterations. Stopping diagnostic loop.")
@@ -408,44 +831,93 @@ Keep your final answer brief and actionable."""
     })
 
 
+async def ainput(prompt: str = "") -> str:
+    """input() that doesn't block the event loop. Reads on a daemon thread so
+    background tasks keep running and interpreter exit never waits on a pending read."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _deliver(value, exc):
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(value)
+
+    def _read():
+        try:
+            value, exc = input(prompt), None
+        except BaseException as e:  # EOFError etc. are re-raised in the caller
+            value, exc = None, e
+        try:
+            loop.call_soon_threadsafe(_deliver, value, exc)
+        except RuntimeError:
+            pass  # loop already closed
+
+    threading.Thread(target=_read, name="agent-input", daemon=True).start()
+    return await future
+
+
 # Run agent loop
 async def main():
     """Runs the main agent loop to process user commands."""
-    
-    # 1. Get instructions from server
-    instructions = await get_instructions_from_server()
-    if not instructions:
-        print("👋 Exiting agent.")
-        return
-        
-    prompt_template = get_prompt_template(instructions)
+    if _log_listener is not None:
+        _log_listener.start()
+    # Fetched silently in the background while the user types; reported where it is awaited
+    instructions_task = asyncio.create_task(_fetch_instructions())
+    try:
+        await _run_agent(instructions_task)
+    finally:
+        # An early exit can leave the fetch pending; settle it before closing its client
+        instructions_task.cancel()
+        await asyncio.gather(instructions_task, return_exceptions=True)
+        await _HTTP.aclose()
+        if _OAI is not None:
+            await _OAI.close()
+        if _log_listener is not None:
+            _log_listener.stop()
+
+
+async def _run_agent(instructions_task: asyncio.Task):
+    # 1. Instructions are fetched by instructions_task in the background while the user types
+    index = None
+    prompt_template = None
 
     print("\n🤖 K8s Agent is running. Type 'exit' or 'quit' to stop.")
     print("💡 Tip: Start your question with 'diagnose' or 'plan' for multi-step reasoning.\n")
     while True:
         try:
-            user_input = input("\n🧠 Enter your K8s command (natural language): ")
+            user_input = await ainput("\n🧠 Enter your K8s command (natural language): ")
             if user_input.lower() in ["exit", "quit"]:
                 print("👋 Exiting agent.")
                 break
 
+            if index is None:
+                instructions = await get_instructions_from_server(instructions_task)
+                if not instructions:
+                    print("👋 Exiting agent.")
+                    return
+                index = InstructionsIndex(instructions)
+                prompt_template = get_prompt_template(instructions)
+
             # --- Detect diagnostic mode keywords ---
             user_input_lower = user_input.lower()
             if user_input_lower.startswith("diagnose ") or user_input_lower.startswith("plan "):
                 # Strip keyword and run diagnostic loop
                 question = user_input.split(maxsplit=1)[1] if len(user_input.split(maxsplit=1)) > 1 else user_input
-                await run_diagnostic_loop(question, instructions)
+                await run_diagnostic_loop(question, index)
                 continue
 
             # Log the raw user input
             request_id = str(uuid.uuid4())
             t0 = time.time()
-            agent_logger.info(redact_dict({
+            agent_logger.info({
                 "event": "user_input",
                 "session_id": SESSION_ID,
                 "request_id": request_id,
                 "input": user_input,
-            }))
+            })
 
             # 2. Parse into instruction
             command_json = await parse_nl_to_command(user_input, prompt_template)
@@ -454,37 +926,31 @@ async def main():
                 continue
 
             # 2a. Fill missing required params interactively when needed
-            command_json, cancelled = fill_missing_required_params(command_json, instructions)
+            command_json, cancelled = await fill_missing_required_params(command_json, index)
             if cancelled:
                 continue
 
             # Log parsed command
             parse_ms = int((time.time() - t0) * 1000)
-            agent_logger.info(redact_dict({
+            agent_logger.info({
                 "event": "parsed_command",
                 "session_id": SESSION_ID,
                 "request_id": request_id,
                 "parse_ms": parse_ms,
                 "parsed": command_json,
-            }))
+            })
 
-            print(f"\n✅ Parsed command:\n{json.dumps(command_json, indent=2)}")
+            print(f"\n✅ Parsed command:\n{json_dumps(command_json, indent=True)}")
 
             # 3. Send to MCP and get detailed result
-            # Attach request_id into params so server logs the same id
-            try:
-                params = command_json.get("params") or {}
-                params["request_id"] = request_id
-                command_json["params"] = params
-            except Exception:
-                pass
+            _attach_request_id(command_json, request_id)
 
             http_t0 = time.time()
             result = await call_mcp_server(command_json)
             if result:
                 # Log server result summary
                 http_ms = int((time.time() - http_t0) * 1000)
-                agent_logger.info(redact_dict({
+                agent_logger.info({
                     "event": "mcp_result",
                     "session_id": SESSION_ID,
                     "request_id": request_id,
@@ -492,26 +958,31 @@ async def main():
                     "instruction": command_json.get("instruction"),
                     "command": result.get("command"),
                     "returncode": result.get("returncode"),
-                }))
+                })
                 # Handle confirmation-required flow
                 if isinstance(result, dict) and result.get("confirmation_required"):
-                    print("\n⚠️  This action modifies cluster state and requires confirmation.")
-                    print(f"  Request ID: {request_id}")
-                    print(f"  Instruction: {command_json.get('instruction')}")
-                    disp_cmd = result.get('display_command') or result.get('command')
-                    print(f"  Command: {disp_cmd}")
+                    disp_cmd = result.get("display_command") or result.get("command")
                     msg = result.get("message")
-                    if msg:
-                        print(f"  Note: {msg}")
                     preview = result.get("preview") or {}
+                    lines = [
+                        "\n⚠️  This action modifies cluster state and requires confirmation.",
+                        f"  Request ID: {request_id}",
+                        f"  Instruction: {command_json.get('instruction')}",
+                        f"  Command: {disp_cmd}",
+                    ]
+                    if msg:
+                        lines.append(f"  Note: {msg}")
                     if preview.get("supported"):
-                        print("\n� Dry-run preview:")
-                        print(f"  Preview Command: {preview.get('command')}")
-                        if preview.get("stdout"):
-                            print(f"\n  Preview Stdout:\n{preview.get('stdout')}")
-                        if preview.get("stderr"):
-                            print(f"\n  Preview Stderr:\n{preview.get('stderr')}")
-                    ans = input("\nProceed with execution? (y/N): ").strip().lower()
+                        preview_stdout = preview.get("stdout")
+                        preview_stderr = preview.get("stderr")
+                        lines.append("\n� Dry-run preview:")
+                        lines.append(f"  Preview Command: {preview.get('command')}")
+                        if preview_stdout:
+                            lines.append(f"\n  Preview Stdout:\n{preview_stdout}")
+                        if preview_stderr:
+                            lines.append(f"\n  Preview Stderr:\n{preview_stderr}")
+                    sys.stdout.write("\n".join(lines) + "\n")
+                    ans = (await ainput("\nProceed with execution? (y/N): ")).strip().lower()
                     if ans in ("y", "yes"): 
                         # Resubmit with confirm=true
                         try:
@@ -525,29 +996,32 @@ async def main():
                         print("🚫 Cancelled by user.")
                         continue
 
-                print("\n� MCP Execution Details:")
-                print(f"  Request ID: {request_id}")
+                rc = result.get("returncode")
+                disp_cmd = result.get("display_command") or result.get("command")
+                summary = result.get("summary")
+                stdout_text = result.get("stdout")
+                stderr_text = result.get("stderr")
+
+                lines = ["\n� MCP Execution Details:", f"  Request ID: {request_id}"]
                 # If server provided a concise summary, print it first for a clean demo output
-                if isinstance(result, dict) and result.get("summary"):
-                    print("\n📄 Summary:")
-                    print(result["summary"])  # Already human-friendly lines
-                disp_cmd = result.get('display_command') or result.get('command')
-                print(f"  Command: {disp_cmd}")
-                print(f"  Return Code: {result.get('returncode')}")
-
-                stdout_text = result.get('stdout')
+                if summary:
+                    lines.append("\n📄 Summary:")
+                    lines.append(summary)  # Already human-friendly lines
+                lines.append(f"  Command: {disp_cmd}")
+                lines.append(f"  Return Code: {rc}")
                 if stdout_text:
-                    print(f"\n  Stdout:\n{stdout_text}")
-
-                stderr_text = result.get('stderr')
+                    lines.append(f"\n  Stdout:\n{stdout_text}")
                 if stderr_text:
-                    print(f"\n  Stderr:\n{stderr_text}")
+                    lines.append(f"\n  Stderr:\n{stderr_text}")
 
                 # Provide a clear success/failure message based on the return code
-                if result.get('returncode') == 0:
-                    print("\n✅ Command executed successfully.")
+                if rc == 0:
+                    lines.append("\n✅ Command executed successfully.")
                 else:
-                    print("\n❌ Command finished with an error or warning.")
+                    lines.append("\n❌ Command finished with an error or warning.")
+                    # Don't keep serving a parse that led to a failing command
+                    evict_parsed_command(user_input)
+                sys.stdout.write("\n".join(lines) + "\n")
 
         except KeyboardInterrupt:
             print("\n👋 Exiting agent.")
@@ -555,4 +1029,8 @@ async def main():
 
 # Entry point
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # Ctrl+C while awaiting input cancels main(); resources are closed in its finally
+        print("\n👋 Exiting agent.")
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Unit tests for the agent's parsed-command cache.
+
+A cached template must only ever substitute the new message's identifiers into the
+param values they came from; anything it can't account for is not cached.
+"""
+
+import pytest
+
+import agent
+from agent import _normalize_message, _parse_cache_get, _parse_cache_put
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache(monkeypatch):
+    monkeypatch.setattr(agent, "_parse_cache", type(agent._parse_cache)())
+
+
+def _put(message, command_json):
+    _parse_cache_put(*_normalize_message(message), command_json)
+
+
+def _get(message):
+    return _parse_cache_get(*_normalize_message(message))
+
+
+def test_same_shape_reuses_the_template_with_new_names():
+    """Verify a cached parse answers a new message with its own identifiers"""
+    _put("describe deployment 'web-1' in namespace 'prod'", {
+        "instruction": "describe_resource",
+        "params": {"resource_type": "deployment", "resource_name": "web-1", "namespace": "prod"},
+    })
+
+    assert _get("Describe deployment 'api-2' in namespace 'staging'.") == {
+        "instruction": "describe_resource",
+        "params": {"resource_type": "deployment", "resource_name": "api-2", "namespace": "staging"},
+    }
+
+
+def test_identifier_also_used_as_unquoted_literal_is_not_cached():
+    """Verify 'nginx' as both the quoted name and the image never turns the image into the new name"""
+    _put("create deployment 'nginx' with image nginx", {
+        "instruction": "create_deployment",
+        "params": {"deployment_name": "nginx", "image": "nginx"},
+    })
+
+    assert _get("create deployment 'web' with image nginx") is None
+
+
+def test_identifier_matching_message_words_is_not_cached():
+    """Verify a name like 'pod' never rewrites the instruction or param names"""
+    _put("show logs for pod 'pod'", {"instruction": "get_pod_logs", "params": {"pod_name": "pod"}})
+
+    assert _get("show logs for pod 'api'") is None
+
+
+@pytest.mark.parametrize("message, command_json", [
+    # namespace was defaulted by the model, not taken from the message
+    ("describe pod 'web-1'", {"instruction": "describe_resource", "params": {"resource_name": "web-1", "namespace": "default"}}),
+    # the parse dropped an identifier, so its slot is unknown
+    ("copy 'a-1' to 'b-2'", {"instruction": "describe_resource", "params": {"resource_name": "a-1"}}),
+], ids=["defaulted-value", "unused-identifier"])
+def test_values_the_key_does_not_determine_are_not_cached(message, command_json):
+    """Verify parses with values not derived from the message are left uncached"""
+    _put(message, command_json)
+
+    assert _get(message) is None
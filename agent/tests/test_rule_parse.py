@@ -0,0 +1,48 @@
+"""
+Unit tests for the agent's rule-based command parser.
+
+These cover the shapes _rule_based_parse answers without calling the LLM, and the
+ones it must hand back (None) so the model parses them instead.
+"""
+
+import pytest
+
+from agent import _rule_based_parse
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("list pods", {"instruction": "get_resources", "params": {"resource_type": "pods", "namespace": "default"}}),
+    ("show me all the deployments in staging",
+     {"instruction": "get_resources", "params": {"resource_type": "deployments", "namespace": "staging"}}),
+    ("get services in namespace kube-system",
+     {"instruction": "get_resources", "params": {"resource_type": "services", "namespace": "kube-system"}}),
+    ("list pods in all namespaces", {"instruction": "get_resources", "params": {"resource_type": "pods", "all_namespaces": True}}),
+    ("List pods in all namespace?", {"instruction": "get_resources", "params": {"resource_type": "pods", "all_namespaces": True}}),
+    ("show events in all namespace", {"instruction": "get_events", "params": {"namespace": "all"}}),
+    ("list events", {"instruction": "get_events", "params": {"namespace": "default"}}),
+    ("describe pod web-1 in prod",
+     {"instruction": "describe_resource", "params": {"resource_type": "pod", "resource_name": "web-1", "namespace": "prod"}}),
+    ("show logs for pod api-7", {"instruction": "get_pod_logs", "params": {"pod_name": "api-7", "namespace": "default"}}),
+])
+def test_rule_based_parse_handles_simple_commands(message, expected):
+    """Verify common list/describe/logs/events phrasings parse without the LLM"""
+    assert _rule_based_parse(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    "describe pod web-1 in all namespaces",
+    "logs for web-1 in all namespace",
+    "why is my deployment crashing",
+    "scale web to 3 replicas",
+    # determiners/pronouns before "namespace" don't name one
+    "show pods in my namespace",
+    "get pods in this namespace",
+    "list services in the current namespace",
+    "list deployments in our namespace",
+    "show events in every namespace",
+    "describe pod web-1 in that namespace",
+    "logs for api-7 in your namespace",
+])
+def test_rule_based_parse_defers_to_llm(message):
+    """Verify anything outside the simple shapes returns None"""
+    assert _rule_based_parse(message) is None
@@ -0,0 +1,58 @@
+"""
+Unit tests for shrinking kubectl JSON tool results before the diagnostic LLM sees them.
+"""
+
+import json
+
+import pytest
+
+from agent import _shrink_kubectl_json
+
+_CRASHLOOP_POD = {
+    "kind": "Pod",
+    "apiVersion": "v1",
+    "metadata": {"name": "api-7", "namespace": "prod", "labels": {"app": "api"}},
+    "spec": {"containers": [{"name": "api", "image": "api:1.2"}]},
+    "status": {
+        "phase": "Running",
+        "containerStatuses": [{
+            "name": "api",
+            "ready": False,
+            "restartCount": 12,
+            "image": "api:1.2",
+            "state": {"waiting": {"reason": "CrashLoopBackOff", "message": "back-off 5m0s restarting failed container"}},
+            "lastState": {"terminated": {"reason": "Error", "exitCode": 1, "startedAt": "2026-10-15T10:00:00Z"}},
+        }],
+    },
+}
+
+
+def test_crashloop_pod_keeps_container_state_and_reasons():
+    """Verify a CrashLoopBackOff pod doesn't shrink to just phase: Running"""
+    text = json.dumps({"kind": "List", "apiVersion": "v1", "items": [_CRASHLOOP_POD]})
+
+    assert json.loads(_shrink_kubectl_json(text)) == [{
+        "kind": "Pod",
+        "name": "api-7",
+        "namespace": "prod",
+        "phase": "Running",
+        "containers": [{
+            "name": "api",
+            "ready": False,
+            "restartCount": 12,
+            "state": {"waiting": {"reason": "CrashLoopBackOff", "message": "back-off 5m0s restarting failed container"}},
+            "lastState": {"terminated": {"reason": "Error", "exitCode": 1}},
+        }],
+    }]
+
+
+@pytest.mark.parametrize("text", [
+    # check_hpa_readiness and other scripted diagnostics print their own JSON
+    json.dumps({"namespace": "default", "metricsApiAvailable": True, "deployments": []}),
+    json.dumps([{"name": "web", "cpuRequests": True}]),
+    "NAME    READY   STATUS\nweb-1   1/1     Running",
+    "{not json",
+], ids=["hpa-readiness", "bare-list", "table", "invalid"])
+def test_non_kubectl_output_is_returned_unchanged(text):
+    """Verify only Kubernetes object/List shapes are shrunk"""
+    assert _shrink_kubectl_json(text) == text
@@ -0,0 +1,162 @@
+"""
+Optional in-process Kubernetes API reads for the MCP server.
+
+When kubernetes_asyncio is installed and a kubeconfig loads at startup, structured
+(`-o json`) reads of pods, deployments and services are served through one pooled
+ApiClient instead of spawning kubectl for each request. Every other instruction, and
+any read the API path cannot answer, keeps going through kubectl.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+try:
+    from kubernetes_asyncio import client as k8s_client, config as k8s_config
+except ImportError:  # optional dependency; kubectl handles every read without it
+    k8s_client = None
+    k8s_config = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# resource_type -> (api group, namespaced list, all-namespaces list, namespaced read, kind, apiVersion)
+_READS = {
+    "pod": ("core", "list_namespaced_pod", "list_pod_for_all_namespaces", "read_namespaced_pod", "Pod", "v1"),
+    "deployment": ("apps", "list_namespaced_deployment", "list_deployment_for_all_namespaces", "read_namespaced_deployment", "Deployment", "apps/v1"),
+    "service": ("core", "list_namespaced_service", "list_service_for_all_namespaces", "read_namespaced_service", "Service", "v1"),
+}
+_READS["pods"] = _READS["pod"]
+_READS["deployments"] = _READS["deployment"]
+_READS["services"] = _READS["svc"] = _READS["service"]
+
+# Instructions whose structured form is a plain `kubectl get ... -o json`
+_READ_INSTRUCTIONS = frozenset({"get_resources", "describe_resource"})
+
+_api: Optional[Dict[str, Any]] = None  # {"client": ApiClient, "core": CoreV1Api, "apps": AppsV1Api, "binding": tuple}
+_rebind_lock = asyncio.Lock()
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode()
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+async def start(binding: tuple) -> bool:
+    """Load the kubeconfig and open the shared ApiClient. Returns False if unavailable.
+
+    binding is the (kubeconfig key, current context) pair the client is loaded for;
+    execute_read reloads the client when the caller's binding no longer matches.
+    """
+    global _api
+    if k8s_client is None or _api is not None:
+        return _api is not None
+    try:
+        await k8s_config.load_kube_config()
+    except Exception:
+        return False
+    api_client = k8s_client.ApiClient()
+    _api = {
+        "client": api_client,
+        "core": k8s_client.CoreV1Api(api_client),
+        "apps": k8s_client.AppsV1Api(api_client),
+        "binding": binding,
+    }
+    return True
+
+
+async def stop() -> None:
+    """Close the shared ApiClient (and its connection pool)"""
+    global _api
+    if _api is not None:
+        api, _api = _api, None
+        await api["client"].close()
+
+
+async def _rebind(binding: tuple) -> bool:
+    """Reload the ApiClient after a context switch or kubeconfig edit. Returns False if that fails."""
+    global _api
+    async with _rebind_lock:
+        if _api is None:
+            return False
+        if _api["binding"] == binding:
+            return True
+        old, _api = _api, None
+        try:
+            return await start(binding)
+        finally:
+            # Reads still in flight on the old client fail over to kubectl
+            await old["client"].close()
+
+
+def _read_target(instruction: str, params: Dict[str, Any]) -> Optional[tuple]:
+    """Return (spec, namespace, name) when the request maps onto an API read, else None"""
+    if _api is None or instruction not in _READ_INSTRUCTIONS or not params.get("structured_output"):
+        return None
+    spec = _READS.get(str(params.get("resource_type", "")).lower())
+    if spec is None:
+        return None
+    namespace = params.get("namespace", "default")
+    if str(namespace).lower() in {"all", "*"}:
+        return None
+    all_namespaces = instruction == "get_resources" and bool(params.get("all_namespaces"))
+    name = params.get("resource_name", "")
+    if instruction == "describe_resource" and not name:
+        return None
+    return spec, None if all_namespaces else namespace, None if all_namespaces else (name or None)
+
+
+async def execute_read(instruction: str, params: Dict[str, Any], timeout_seconds: int, binding: tuple) -> Optional[tuple]:
+    """Serve a structured read through the API client loaded for binding.
+
+    Returns the same (stdout, stderr, returncode, timed_out, duration_ms, truncated)
+    tuple as the kubectl path, or None when the caller should run kubectl instead (no
+    mapping, API error, non-200 status - kubectl then reports the error in its usual form).
+    A binding that differs from the client's (use_context, KUBECONFIG edit) reloads it
+    first, so reads never reach the previous cluster.
+    """
+    target = _read_target(instruction, params)
+    if target is None:
+        return None
+    if _api["binding"] != binding and not await _rebind(binding):
+        return None
+    (group, list_ns, list_all, read_ns, kind, api_version), namespace, name = target
+    api = _api[group]
+    loop = asyncio.get_running_loop()
+    start_ts = loop.time()
+    kwargs = {"_preload_content": False, "_request_timeout": timeout_seconds}
+    if not name and params.get("label_selector"):
+        kwargs["label_selector"] = params["label_selector"]
+    try:
+        if name:
+            resp = await getattr(api, read_ns)(name, namespace, **kwargs)
+        elif namespace is None:
+            resp = await getattr(api, list_all)(**kwargs)
+        else:
+            resp = await getattr(api, list_ns)(namespace, **kwargs)
+        if resp.status != 200:
+            resp.release()
+            return None
+        doc = _loads(await resp.read())
+    except Exception:
+        return None
+
+    # Match kubectl -o json: typed items inside a generic List
+    if name:
+        doc.setdefault("kind", kind)
+        doc.setdefault("apiVersion", api_version)
+    else:
+        for item in doc.get("items") or ():
+            item.setdefault("kind", kind)
+            item.setdefault("apiVersion", api_version)
+        doc["kind"] = "List"
+        doc["apiVersion"] = "v1"
+    duration_ms = int((loop.time() - start_ts) * 1000)
+    return _dumps(doc), b"", 0, False, duration_ms, False
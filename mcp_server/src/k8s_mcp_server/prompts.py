@@ -5,8 +5,67 @@ This module generates kubectl commands for various Kubernetes operations.
 Functions return command strings that are executed by the server.
 """
 
-import textwrap
+# base64/textwrap stay top-level: the script templates below are dedented and
+# encoded at import, and the server's FastAPI stack has loaded both already
 import base64
+import functools
+import sys
+import textwrap
+
+
+# Builders are pure functions of their arguments and get called with the same few
+# argument sets over and over, so the string-returning ones are memoized.
+_CACHED_BUILDERS = []
+
+
+def _cached(fn):
+    """Memoizes a command builder (typed, so 1 and True don't share an entry).
+
+    LLM-supplied params can be lists or dicts; those calls can't be hashed and go
+    straight to the undecorated builder instead.
+    """
+    cached = functools.lru_cache(maxsize=256, typed=True)(fn)
+
+    @functools.wraps(fn)
+    def builder(*args, **kwargs):
+        try:
+            return cached(*args, **kwargs)
+        except TypeError:
+            return fn(*args, **kwargs)
+
+    builder.cache_info = cached.cache_info
+    builder.cache_clear = cached.cache_clear
+    _CACHED_BUILDERS.append(cached)
+    return builder
+
+
+def _clear_command_caches() -> None:
+    """Empties every memoized builder (used by tests)."""
+    for cached in _CACHED_BUILDERS:
+        cached.cache_clear()
+
+
+# Flags shared across builders, interned once so every command reuses the same objects
+_IGNORE_NOT_FOUND = sys.intern("--ignore-not-found")
+_WAIT_FALSE = sys.intern("--wait=false")
+_FORCE = sys.intern("--force")
+_ALL_NS = sys.intern("-A")
+_ALL_CONTAINERS = sys.intern("--all-containers")
+_PREVIOUS = sys.intern("-p")
+_FOLLOW = sys.intern("-f")
+_WATCH = sys.intern("-w")
+_GRACE_ZERO = sys.intern("--grace-period=0")
+
+
+def _kubectl(verb: str, *tokens: str, namespace: str = "", all_namespaces: bool = False, flags=()) -> str:
+    """Joins 'kubectl <verb> <tokens...> [-A | -n <namespace>] <flags...>'."""
+    parts = ["kubectl", verb, *tokens]
+    if all_namespaces:
+        parts.append(_ALL_NS)
+    elif namespace:
+        parts += ("-n", namespace)
+    parts.extend(flags)
+    return " ".join(parts)
 
 
 # =============================================================================
@@ -77,7 +136,7 @@ def get_events(namespace: str = "default", watch: bool = False, sort_by_time: bo
         watch: If True, streams the events as they occur (-w).
         sort_by_time: If True, sorts events by timestamp (recommended).
     """
-    watch_str = "-w" if watch else ""
+    watch_str = _WATCH if watch else ""
     sort_str = "--sort-by='.lastTimestamp'" if sort_by_time else ""
     
     if namespace.lower() in ("all", "*"):
@@ -89,6 +148,7 @@ def get_events(namespace: str = "default", watch: bool = False, sort_by_time: bo
 # POD OPERATIONS
 # =============================================================================
 
+@_cached
 def get_pod_logs(
     pod_name: str = "",
     namespace: str = "default",
@@ -110,21 +170,27 @@ def get_pod_logs(
         label_selector: Optional Kubernetes label selector (uses '-l'). Ignored if pod_name is provided.
         all_containers: If True, include logs from all containers in the selected pod(s).
     """
-    container_part = f"-c {container}" if (container and not all_containers) else ""
-    previous_part = "-p" if previous else ""
-    follow_part = "-f" if follow else ""
-    all_cont_part = "--all-containers" if all_containers else ""
-    selector_part = f"-l \"{label_selector}\"" if (label_selector and not pod_name) else ""
-    
-    flags = f"{container_part} {all_cont_part} {previous_part} {follow_part} {selector_part}".strip()
-    base = f"kubectl logs -n {namespace}"
-    if selector_part:
-        return f"{base} {flags}".strip()
-    if not pod_name:
+    use_selector = bool(label_selector and not pod_name)
+    if not (use_selector or pod_name):
         return "# Error: Provide 'pod_name' or 'label_selector' to select target pods for logs"
-    return f"{base} {pod_name} {flags}".strip()
-
 
+    parts = ["kubectl", "logs", "-n", namespace]
+    if not use_selector:
+        parts.append(pod_name)
+    if container and not all_containers:
+        parts += ("-c", container)
+    if all_containers:
+        parts.append(_ALL_CONTAINERS)
+    if previous:
+        parts.append(_PREVIOUS)
+    if follow:
+        parts.append(_FOLLOW)
+    if use_selector:
+        parts += ("-l", f"\"{label_selector}\"")
+    return " ".join(parts)
+
+
+@_cached
 def get_pod_usage(
     resource_type: str = "pods",
     resource_name: str = "",
@@ -143,25 +209,26 @@ def get_pod_usage(
         all_namespaces: If True, query across all namespaces (uses -A).
         sort_by: Optional sort column ('cpu', 'memory', or '').
     """
-    cmd = f"kubectl top {resource_type}"
+    parts = ["kubectl", "top", resource_type]
 
     if resource_name:
-        cmd += f" {resource_name}"
-        
+        parts.append(resource_name)
+
     if all_namespaces:
-        cmd += " -A"
+        parts.append(_ALL_NS)
     elif namespace and not resource_name:
-        cmd += f" -n {namespace}"
-    
+        parts += ("-n", namespace)
+
     if sort_by:
         if resource_type == 'pods':
-            cmd += f" --sort-by='.{sort_by}'"
+            parts.append(f"--sort-by='.{sort_by}'")
         else:
-            cmd += f" --sort-by={sort_by}"
+            parts.append(f"--sort-by={sort_by}")
 
-    return cmd
+    return " ".join(parts)
 
 
+@_cached
 def delete_pod(
     pod_name: str,
     namespace: str = "default",
@@ -182,21 +249,18 @@ def delete_pod(
         force: If True, force immediate deletion (adds --force with grace-period=0). Use only if stuck.
         grace_period: Seconds to wait before terminating the pod. 0 for immediate.
     """
-    parts = [
-        "kubectl delete pod",
-        pod_name,
-        f"-n {namespace}",
-    ]
+    flags = []
     if ignore_not_found:
-        parts.append("--ignore-not-found")
-    parts.append(f"--grace-period={int(grace_period)}")
+        flags.append(_IGNORE_NOT_FOUND)
+    flags.append(_GRACE_ZERO if grace_period == 0 else f"--grace-period={int(grace_period)}")
     if not wait:
-        parts.append("--wait=false")
+        flags.append(_WAIT_FALSE)
     if force:
-        parts.append("--force")
-    return " ".join(parts).strip()
+        flags.append(_FORCE)
+    return _kubectl("delete", "pod", pod_name, namespace=namespace, flags=flags)
 
 
+@_cached
 def delete_completed_pods(
     namespace: str = "default",
     label_selector: str = "",
@@ -217,18 +281,21 @@ def delete_completed_pods(
         - Uses a field selector to match only Succeeded pods (Completed jobs/one-shots).
         - Label selector is combined (logical AND) with the field selector when provided.
     """
-    selector_part = f"-l \"{label_selector}\"" if label_selector else ""
-    parts = [
-        "kubectl delete pod",
-        f"-n {namespace}",
-        selector_part,
-        "--field-selector=status.phase=Succeeded",
-    ]
+    flags = []
+    if label_selector:
+        flags += ("-l", f"\"{label_selector}\"")
+    flags.append("--field-selector=status.phase=Succeeded")
     if ignore_not_found:
-        parts.append("--ignore-not-found")
+        flags.append(_IGNORE_NOT_FOUND)
     if not wait:
-        parts.append("--wait=false")
-    return " ".join(p for p in parts if p).strip()
+        flags.append(_WAIT_FALSE)
+    return _kubectl("delete", "pod", namespace=namespace, flags=flags)
+
+
+# One-shot diagnostic/load pods: 'kubectl run' with the container command after '--'
+_KUBECTL_RUN_TEMPLATE = "kubectl run {pod} -n {ns} --image={img} --restart=Never -- {cmd}"
+_DNSUTILS_IMAGE = "registry.k8s.io/e2e-test-images/jessie-dnsutils:1.3"
+_CURL_TEST_BODY = 'sh -c "if curl -s -o /dev/null -f {url}; then echo OK; else echo FAIL; fi"'
 
 
 def dns_lookup(name: str, namespace: str = "default", pod_name: str = "dnscheck", replace_existing: bool = False) -> str:
@@ -244,13 +311,11 @@ def dns_lookup(name: str, namespace: str = "default", pod_name: str = "dnscheck"
         - Run this instruction, then use get_pod_logs(pod_name, follow=False) to see results,
           and delete the pod when done.
     """
-    image = "registry.k8s.io/e2e-test-images/jessie-dnsutils:1.3"
-    run_cmd = (
-        f"kubectl run {pod_name} -n {namespace} --image={image} --restart=Never -- "
-        f"nslookup {name}"
-    )
+    run_cmd = _KUBECTL_RUN_TEMPLATE.format(pod=pod_name, ns=namespace, img=_DNSUTILS_IMAGE, cmd=f"nslookup {name}")
     if replace_existing:
-        return f"kubectl delete pod {pod_name} -n {namespace} --ignore-not-found; {run_cmd}"
+        # Plain delete (waits, default grace period): the old pod must be gone
+        # before 'kubectl run' reuses its name
+        return f"{_kubectl('delete', 'pod', pod_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))}; {run_cmd}"
     return run_cmd
 
 
@@ -267,12 +332,13 @@ def curl_test(url: str, namespace: str = "default", pod_name: str = "curltest",
         - Avoids curl -w percent format to keep it Windows-shell friendly.
         - Prints 'OK' on 2xx, 'FAIL' otherwise. View via get_pod_logs.
     """
-    run_cmd = (
-        f"kubectl run {pod_name} -n {namespace} --image=curlimages/curl --restart=Never -- "
-        f"sh -c \"if curl -s -o /dev/null -f {url}; then echo OK; else echo FAIL; fi\""
+    run_cmd = _KUBECTL_RUN_TEMPLATE.format(
+        pod=pod_name, ns=namespace, img="curlimages/curl", cmd=_CURL_TEST_BODY.format(url=url)
     )
     if replace_existing:
-        return f"kubectl delete pod {pod_name} -n {namespace} --ignore-not-found; {run_cmd}"
+        # Plain delete (waits, default grace period): the old pod must be gone
+        # before 'kubectl run' reuses its name
+        return f"{_kubectl('delete', 'pod', pod_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))}; {run_cmd}"
     return run_cmd
 
 
@@ -280,6 +346,109 @@ def curl_test(url: str, namespace: str = "default", pod_name: str = "curltest",
 # DEPLOYMENT OPERATIONS
 # =============================================================================
 
+# Deployment manifest for create_deployment_apply. The optional volume blocks are
+# already indented for their place in the pod spec and appended after the limits.
+_DEPLOY_YAML_TEMPLATE = textwrap.dedent("""\
+    apiVersion: apps/v1
+    kind: Deployment
+    metadata:
+      name: {deployment_name}
+      namespace: {namespace}
+      labels:
+        app: {deployment_name}
+    spec:
+      replicas: {replicas}
+      selector:
+        matchLabels:
+          app: {deployment_name}
+      template:
+        metadata:
+          labels:
+            app: {deployment_name}
+        spec:
+          containers:
+          - name: {container_name}
+            image: {image}
+            ports:
+            - containerPort: {container_port}
+            resources:
+              requests:
+                cpu: "{cpu_request}"
+                memory: "{memory_request}"
+              limits:
+                cpu: "{cpu_limit}"
+                memory: "{memory_limit}"{volume_mount_spec}{volume_spec}""")
+
+_DEPLOY_VOLUME_MOUNT_TEMPLATE = """
+        volumeMounts:
+        - name: app-storage
+          mountPath: {volume_mount_path}"""
+
+_DEPLOY_VOLUME_TEMPLATE = """
+      volumes:
+      - name: app-storage
+        persistentVolumeClaim:
+          claimName: {pvc_claim_name}"""
+
+# The PowerShell wrapper around the manifest is constant, so its UTF-16LE/base64 form
+# is computed once. Base64 chunks concatenate cleanly only on 3-byte boundaries:
+# the head is 12 UTF-16 chars (24 bytes) and the manifest is padded to match.
+_DEPLOY_APPLY_PS_HEAD = "\n$yaml = @'\n"
+_DEPLOY_APPLY_PS_TAIL = "\n'@\nWrite-Output $yaml | kubectl apply --wait=false -f -\n"
+_DEPLOY_APPLY_PS_HEAD_B64 = base64.b64encode(_DEPLOY_APPLY_PS_HEAD.encode("utf-16-le")).decode("ascii")
+_DEPLOY_APPLY_PS_TAIL_B64 = base64.b64encode(_DEPLOY_APPLY_PS_TAIL.encode("utf-16-le")).decode("ascii")
+assert len(_DEPLOY_APPLY_PS_HEAD.encode("utf-16-le")) % 3 == 0
+
+
+def _encode_deploy_apply_ps(yaml_text: str) -> str:
+    """Base64 of the full apply script, encoding only the manifest per call."""
+    # The built-in codec already widens ASCII in C; interleaving by hand
+    # (bytearray slice assignment) measured about 3x slower
+    body = yaml_text.encode("utf-16-le")
+    # Trailing spaces (two bytes each) are harmless after the last YAML line
+    pad = (-(len(body) // 2)) % 3
+    if pad:
+        body += "  ".encode("utf-16-le")[: 2 * pad]
+    return _DEPLOY_APPLY_PS_HEAD_B64 + base64.b64encode(body).decode("ascii") + _DEPLOY_APPLY_PS_TAIL_B64
+
+
+def _with_preview(render):
+    """Attaches a static manifest renderer, used for previews instead of a kubectl dry-run."""
+    def decorate(fn):
+        fn._mcp_preview = render
+        return fn
+    return decorate
+
+
+def _render_deploy_yaml(
+    deployment_name, image, replicas, namespace, container_port,
+    cpu_request, memory_request, cpu_limit, memory_limit, volume_mount_path, pvc_claim_name,
+) -> str:
+    """The Deployment manifest create_deployment_apply applies."""
+    volume_mount_spec = ""
+    volume_spec = ""
+    if pvc_claim_name and volume_mount_path:
+        volume_mount_spec = _DEPLOY_VOLUME_MOUNT_TEMPLATE.format(volume_mount_path=volume_mount_path)
+        volume_spec = _DEPLOY_VOLUME_TEMPLATE.format(pvc_claim_name=pvc_claim_name)
+
+    return _DEPLOY_YAML_TEMPLATE.format(
+        deployment_name=deployment_name,
+        namespace=namespace,
+        replicas=replicas,
+        container_name=deployment_name,
+        image=image,
+        container_port=container_port,
+        cpu_request=cpu_request,
+        memory_request=memory_request,
+        cpu_limit=cpu_limit,
+        memory_limit=memory_limit,
+        volume_mount_spec=volume_mount_spec,
+        volume_spec=volume_spec,
+    )
+
+
+@_with_preview(_render_deploy_yaml)
+@_cached
 def create_deployment_apply(
     deployment_name: str,
     image: str,
@@ -315,72 +484,14 @@ def create_deployment_apply(
         the most robust way to run multi-line scripts on Windows, as it
         bypasses all 'cmd.exe' parsing and quoting issues.
     """
-    container_name = deployment_name 
-
-    volume_spec = ""
-    volume_mount_spec = ""
-    
-    if pvc_claim_name and volume_mount_path:
-        volume_mount_spec = f"""
-        volumeMounts:
-        - name: app-storage
-          mountPath: {volume_mount_path}
-        """
-        volume_spec = f"""
-      volumes:
-      - name: app-storage
-        persistentVolumeClaim:
-          claimName: {pvc_claim_name}
-        """
-        
-    yaml_template = textwrap.dedent(f"""
-        apiVersion: apps/v1
-        kind: Deployment
-        metadata:
-          name: {deployment_name}
-          namespace: {namespace}
-          labels:
-            app: {deployment_name}
-        spec:
-          replicas: {replicas}
-          selector:
-            matchLabels:
-              app: {deployment_name}
-          template:
-            metadata:
-              labels:
-                app: {deployment_name}
-            spec:
-              containers:
-              - name: {container_name}
-                image: {image}
-                ports:
-                - containerPort: {container_port}
-                resources:
-                  requests:
-                    cpu: "{cpu_request}"
-                    memory: "{memory_request}"
-                  limits:
-                    cpu: "{cpu_limit}"
-                    memory: "{memory_limit}"
-                {volume_mount_spec.strip()}
-              {volume_spec.strip()}
-    """)
-
-    # PowerShell here-string wraps YAML for kubectl apply
-    ps_script = f"""
-$yaml = @'
-{yaml_template.strip()}
-'@
-Write-Output $yaml | kubectl apply --wait=false -f -
-"""
+    yaml_text = _render_deploy_yaml(
+        deployment_name, image, replicas, namespace, container_port,
+        cpu_request, memory_request, cpu_limit, memory_limit, volume_mount_path, pvc_claim_name,
+    )
 
-    # Encode as UTF-16LE Base64 for PowerShell -EncodedCommand (Windows-safe)
-    encoded_script = base64.b64encode(
-        ps_script.encode('utf-16-le')
-    ).decode('ascii')
-
-    return f"powershell -EncodedCommand {encoded_script}"
+    # PowerShell here-string wraps YAML for kubectl apply, encoded as UTF-16LE
+    # Base64 for PowerShell -EncodedCommand (Windows-safe)
+    return f"powershell -EncodedCommand {_encode_deploy_apply_ps(yaml_text)}"
 
 
 def delete_deployment_and_related(
@@ -400,13 +511,11 @@ def delete_deployment_and_related(
     """
     if cleanup_related:
         resources_to_delete = "deployment,svc,hpa"
-        return (
-            f"kubectl delete {resources_to_delete} {deployment_name} "
-            f"-n {namespace} --ignore-not-found"
-        )
-    return f"kubectl delete deployment {deployment_name} -n {namespace}"
+        return _kubectl("delete", resources_to_delete, deployment_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))
+    return _kubectl("delete", "deployment", deployment_name, namespace=namespace)
 
 
+@_cached
 def scale_deployment(
     deployment_name: str, 
     namespace: str = "default", 
@@ -431,7 +540,7 @@ def scale_deployment(
     # Accepted for API completeness but doesn't change command (avoids lint warning)
     _ = force_manual_scale
     
-    return f"kubectl scale deployment/{deployment_name} -n {namespace} --replicas={replicas}"
+    return _kubectl("scale", f"deployment/{deployment_name}", namespace=namespace, flags=(f"--replicas={replicas}",))
 
 
 def set_deployment_resources(
@@ -459,28 +568,29 @@ def set_deployment_resources(
     if memory_request:
         requests_args.append(f"memory={memory_request}")
     
-    requests_str = f"--requests={','.join(requests_args)}" if requests_args else ""
-
     limits_args = []
     if cpu_limit:
         limits_args.append(f"cpu={cpu_limit}")
     if memory_limit:
         limits_args.append(f"memory={memory_limit}")
 
-    limits_str = f"--limits={','.join(limits_args)}" if limits_args else ""
-    container_str = f"-c {container_name}" 
-    
-    command_parts = [
-        f"kubectl set resources deployment/{deployment_name}",
-        f"-n {namespace}",
-        container_str,
-        requests_str,
-        limits_str
-    ]
+    # Only flags that are set are added, so nothing needs filtering before the join
+    flags = ["-c", container_name]
+    if requests_args:
+        flags.append(f"--requests={','.join(requests_args)}")
+    if limits_args:
+        flags.append(f"--limits={','.join(limits_args)}")
+    return _kubectl("set", "resources", f"deployment/{deployment_name}", namespace=namespace, flags=flags)
+
 
-    return " ".join(part for part in command_parts if part).strip()
+# Indexed by watch_status: history listing, or a watched status of the current rollout
+_ROLLOUT_FMT = (
+    "kubectl rollout history deployment/{d} -n {ns}",
+    "kubectl rollout status deployment/{d} -n {ns} -w",
+)
 
 
+@_cached
 def get_rollout_history(deployment_name: str, namespace: str = "default", watch_status: bool = False) -> str:
     """
     Gets the rollout history of a Deployment, or watches the status of the current rollout.
@@ -490,11 +600,10 @@ def get_rollout_history(deployment_name: str, namespace: str = "default", watch_
         namespace: The target namespace.
         watch_status: If True, uses 'kubectl rollout status -w' to monitor the current rollout.
     """
-    if watch_status:
-        return f"kubectl rollout status deployment/{deployment_name} -n {namespace} -w"
-    return f"kubectl rollout history deployment/{deployment_name} -n {namespace}"
+    return _ROLLOUT_FMT[bool(watch_status)].format(d=deployment_name, ns=namespace)
 
 
+@_cached
 def undo_rollout(deployment_name: str, namespace: str = "default", revision: int = 0) -> str:
     """
     Reverts a Deployment to a previous revision.
@@ -504,14 +613,20 @@ def undo_rollout(deployment_name: str, namespace: str = "default", revision: int
         namespace: The target namespace.
         revision: The specific revision number to revert to (defaults to the immediately prior revision if 0).
     """
-    revision_str = f"--to-revision={revision}" if revision > 0 else ""
-    return f"kubectl rollout undo deployment/{deployment_name} -n {namespace} {revision_str}".strip()
+    flags = (f"--to-revision={revision}",) if revision > 0 else ()
+    return _kubectl("rollout", "undo", f"deployment/{deployment_name}", namespace=namespace, flags=flags)
 
 
 # =============================================================================
 # SERVICE OPERATIONS
 # =============================================================================
 
+_SERVICE_TYPE_NAMES = ("ClusterIP", "NodePort", "LoadBalancer")
+_VALID_SERVICE_TYPES: frozenset[str] = frozenset(_SERVICE_TYPE_NAMES)
+_VALID_SERVICE_TYPES_STR = ", ".join(_SERVICE_TYPE_NAMES)
+
+
+@_cached
 def expose_deployment(
     deployment_name: str, 
     namespace: str = "default", 
@@ -529,17 +644,14 @@ def expose_deployment(
         target_port: The container port (what the pod listens on).
         service_type: Type of Service ('ClusterIP', 'NodePort', or 'LoadBalancer').
     """
-    valid_types = ["ClusterIP", "NodePort", "LoadBalancer"]
-    if service_type not in valid_types:
-        return f"# Error: Invalid service_type '{service_type}'. Must be one of: {', '.join(valid_types)}"
+    if service_type not in _VALID_SERVICE_TYPES:
+        return f"# Error: Invalid service_type '{service_type}'. Must be one of: {_VALID_SERVICE_TYPES_STR}"
 
-    target_port_str = f"--target-port={target_port}"
-    return (
-        f"kubectl expose deployment/{deployment_name} -n {namespace} "
-        f"--port={port} {target_port_str} --type={service_type}"
-    )
+    flags = (f"--port={port}", f"--target-port={target_port}", f"--type={service_type}")
+    return _kubectl("expose", f"deployment/{deployment_name}", namespace=namespace, flags=flags)
 
 
+@_cached
 def get_service_endpoints(service_name: str, namespace: str = "default", structured_output: bool = False) -> str:
     """
     Retrieves Endpoints for a Service, useful to debug if traffic is routing to ready Pods.
@@ -549,8 +661,8 @@ def get_service_endpoints(service_name: str, namespace: str = "default", structu
         namespace: Namespace of the Service.
         structured_output: If True, return JSON (-o json); otherwise a human-readable wide view.
     """
-    cmd = f"kubectl get endpoints {service_name} -n {namespace}"
-    return f"{cmd} -o json" if structured_output else f"{cmd} -o wide"
+    output = "json" if structured_output else "wide"
+    return _kubectl("get", "endpoints", service_name, namespace=namespace, flags=("-o", output))
 
 
 # =============================================================================
@@ -585,43 +697,18 @@ def create_hpa(
     else:
         metric_str = f"--cpu={cpu_utilization}%"
         
-    return (
-        f"kubectl autoscale deployment/{deployment_name} -n {namespace} "
-        f"--min={min_replicas} --max={max_replicas} {metric_str}"
-    )
+    flags = (f"--min={min_replicas}", f"--max={max_replicas}", metric_str)
+    return _kubectl("autoscale", f"deployment/{deployment_name}", namespace=namespace, flags=flags)
 
 
-def check_hpa_readiness(namespace: str = "default") -> str:
-    """
-    Checks if the cluster is ready for HPA in a given namespace.
-
-    Verifies two things:
-      1) Metrics API availability (via 'kubectl top nodes').
-      2) Each Deployment in the namespace has CPU requests set on at least one container.
-
-    Returns JSON via PowerShell with fields:
-      {
-        "namespace": "<ns>",
-        "metricsServer": true|false,
-        "deploymentsWithCpuRequests": <int>,
-        "deploymentsMissingCpuRequests": <int>,
-        "deployments": [ { name, hasCpuRequests } ]
-      }
-
-    On Windows, uses -EncodedCommand for reliability.
-    """
-    ps_script = textwrap.dedent("""
+# PowerShell body for check_hpa_readiness; '__NS__' is replaced per call
+_HPA_READINESS_TEMPLATE = textwrap.dedent("""
         $ErrorActionPreference = 'SilentlyContinue'
         $ns = '__NS__'
 
-        # 1) Check metrics API availability
-        $metricsOk = $false
-        try {
-            kubectl top nodes | Out-Null
-            $metricsOk = $true
-        } catch {
-            $metricsOk = $false
-        }
+        # 1) Check metrics API availability (raw API read, nothing to render)
+        kubectl get --raw /apis/metrics.k8s.io/v1beta1/nodes 2>$null | Out-Null
+        $metricsOk = ($LASTEXITCODE -eq 0)
 
         # 2) Get deployments and check CPU requests
         $deployJson = kubectl get deploy -n $ns -o json | ConvertFrom-Json
@@ -650,8 +737,30 @@ def check_hpa_readiness(namespace: str = "default") -> str:
             deployments = $items
         }
         $summary | ConvertTo-Json -Depth 6
-    """)
-    ps_script = ps_script.replace('__NS__', namespace)
+""")
+
+
+@_cached
+def check_hpa_readiness(namespace: str = "default") -> str:
+    """
+    Checks if the cluster is ready for HPA in a given namespace.
+
+    Verifies two things:
+      1) Metrics API availability (via 'kubectl get --raw' on the metrics.k8s.io nodes endpoint).
+      2) Each Deployment in the namespace has CPU requests set on at least one container.
+
+    Returns JSON via PowerShell with fields:
+      {
+        "namespace": "<ns>",
+        "metricsServer": true|false,
+        "deploymentsWithCpuRequests": <int>,
+        "deploymentsMissingCpuRequests": <int>,
+        "deployments": [ { name, hasCpuRequests } ]
+      }
+
+    On Windows, uses -EncodedCommand for reliability.
+    """
+    ps_script = _HPA_READINESS_TEMPLATE.replace('__NS__', namespace)
     encoded = base64.b64encode(ps_script.encode('utf-16-le')).decode('ascii')
     return f"powershell -EncodedCommand {encoded}"
 
@@ -660,6 +769,15 @@ def check_hpa_readiness(namespace: str = "default") -> str:
 # CONFIGMAP OPERATIONS
 # =============================================================================
 
+def _ps_quote(text: str) -> str:
+    """Single-quotes text for PowerShell (a literal ' is written as '')."""
+    return "'" + text.replace("'", "''") + "'"
+
+
+# Server-side idempotent create: render the ConfigMap client-side, then apply it
+_CONFIGMAP_APPLY_PS_TEMPLATE = "\n{base_cmd} --dry-run=client -o yaml | kubectl apply -f -\n"
+
+
 def create_configmap(configmap_name: str, namespace: str = "default", data: dict = None, from_file: str = "") -> str:
     """
     Creates or UPDATES a ConfigMap (idempotent operation) using the
@@ -680,47 +798,57 @@ def create_configmap(configmap_name: str, namespace: str = "default", data: dict
         A string command for 'powershell -EncodedCommand' that handles the
         ConfigMap creation or update.
     """
+    # dicts aren't hashable; the cached builder takes the items as a sorted tuple
+    data_items = tuple(sorted(data.items())) if (data and not from_file) else ()
+    return _create_configmap(configmap_name, namespace, data_items, from_file)
+
+
+@_cached
+def _create_configmap(configmap_name: str, namespace: str, data_items: tuple, from_file: str) -> str:
     if from_file:
-        base_cmd = f"kubectl create configmap {configmap_name} -n {namespace} --from-file='{from_file}'"
-    elif data:
-        from_literal = " ".join([f"--from-literal={key}='{value}'" for key, value in data.items()])
+        base_cmd = f"kubectl create configmap {configmap_name} -n {namespace} --from-file={_ps_quote(from_file)}"
+    elif data_items:
+        from_literal = " ".join("--from-literal=" + _ps_quote(f"{key}={value}") for key, value in data_items)
         base_cmd = f"kubectl create configmap {configmap_name} -n {namespace} {from_literal}"
     else:
         return f"# Error: Must provide 'data' (dict) or 'from_file' (str) to create/update configmap {configmap_name}"
 
-    ps_script = textwrap.dedent(f"""
-        {base_cmd} --dry-run=client -o yaml | kubectl apply -f -
-    """)
-    
+    ps_script = _CONFIGMAP_APPLY_PS_TEMPLATE.format(base_cmd=base_cmd)
+
     # Encode as UTF-16LE Base64 for PowerShell -EncodedCommand (Windows-safe)
     encoded_script = base64.b64encode(ps_script.encode('utf-16-le')).decode('ascii')
     return f"powershell -EncodedCommand {encoded_script}"
 
 
+@_cached
 def delete_configmap(configmap_name: str, namespace: str = "default") -> str:
     """Deletes a ConfigMap by name. Safe to call even if it doesn't exist."""
-    return f"kubectl delete configmap {configmap_name} -n {namespace} --ignore-not-found"
+    return _kubectl("delete", "configmap", configmap_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))
 
 
 # =============================================================================
 # CONTEXT AND NAMESPACE MANAGEMENT
 # =============================================================================
 
+@_cached
 def list_contexts() -> str:
     """Lists all kubeconfig contexts."""
     return "kubectl config get-contexts"
 
 
+@_cached
 def get_current_context() -> str:
     """Gets the current kubeconfig context."""
     return "kubectl config current-context"
 
 
+@_cached
 def use_context(context_name: str) -> str:
     """Switches the current kubeconfig context."""
-    return f"kubectl config use-context {context_name}"
+    return _kubectl("config", "use-context", context_name)
 
 
+@_cached
 def list_namespaces() -> str:
     """Lists all namespaces in the cluster."""
     return "kubectl get ns"
@@ -730,6 +858,13 @@ def list_namespaces() -> str:
 # LOAD TESTING AND DIAGNOSTIC HELPERS
 # =============================================================================
 
+# generator -> (image, container command); only the URL varies per call
+_LOAD_BODIES = {
+    "curl": ("curlimages/curl", 'sh -c "while true; do curl -s {url} > /dev/null; done"'),
+    "busybox": ("busybox", '/bin/sh -c "while true; do wget -q -O- {url} > /dev/null; done"'),
+}
+
+
 def start_http_load(
     pod_name: str = "curlgen",
     namespace: str = "default",
@@ -753,20 +888,29 @@ def start_http_load(
         - Use with 'get hpa -w' and 'get deploy -w' to observe scaling.
     """
     gen = (generator or "curl").lower()
-    if gen == "busybox":
-        return (
-            f"kubectl run {pod_name} -n {namespace} --image=busybox --restart=Never -- "
-            f"/bin/sh -c \"while true; do wget -q -O- {url} > /dev/null; done\""
-        )
-    return (
-        f"kubectl run {pod_name} -n {namespace} --image=curlimages/curl --restart=Never -- "
-        f"sh -c \"while true; do curl -s {url} > /dev/null; done\""
-    )
+    image, body = _LOAD_BODIES["busybox" if gen == "busybox" else "curl"]
+    return _KUBECTL_RUN_TEMPLATE.format(pod=pod_name, ns=namespace, img=image, cmd=body.format(url=url))
 
 
+@_cached
 def stop_http_load(pod_name: str = "curlgen", namespace: str = "default") -> str:
     """Stops and deletes the load generator pod created by start_http_load."""
-    return f"kubectl delete pod {pod_name} -n {namespace} --ignore-not-found"
+    return _kubectl("delete", "pod", pod_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))
+
+
+# generator -> (image, container command); counts successful requests per burst of {b}
+_STATS_BODIES = {
+    "curl": (
+        "curlimages/curl",
+        'sh -c "while true; do c=0; i=0; while [ $i -lt {b} ]; do curl -s -o /dev/null {url} && c=$((c+1)); '
+        'i=$((i+1)); done; echo $(date) hits/s=$c; done"',
+    ),
+    "busybox": (
+        "busybox",
+        '/bin/sh -c "while true; do c=0; i=0; while [ $i -lt {b} ]; do wget -q -O- {url} > /dev/null && c=$((c+1)); '
+        'i=$((i+1)); done; echo $(date) hits/s=$c; done"',
+    ),
+}
 
 
 def start_http_load_stats(
@@ -792,19 +936,13 @@ def start_http_load_stats(
     """
     gen = (generator or "curl").lower()
     b = max(1, int(burst_per_second))
-    if gen == "busybox":
-        return (
-            f"kubectl run {pod_name} -n {namespace} --image=busybox --restart=Never -- "
-            f"/bin/sh -c \"while true; do c=0; i=0; while [ $i -lt {b} ]; do wget -q -O- {url} > /dev/null && c=$((c+1)); i=$((i+1)); done; echo $(date) hits/s=$c; done\""
-        )
-    return (
-        f"kubectl run {pod_name} -n {namespace} --image=curlimages/curl --restart=Never -- "
-        f"sh -c \"while true; do c=0; i=0; while [ $i -lt {b} ]; do curl -s -o /dev/null {url} && c=$((c+1)); i=$((i+1)); done; echo $(date) hits/s=$c; done\""
-    )
+    image, body = _STATS_BODIES["busybox" if gen == "busybox" else "curl"]
+    return _KUBECTL_RUN_TEMPLATE.format(pod=pod_name, ns=namespace, img=image, cmd=body.format(b=b, url=url))
 
 
+@_cached
 def stop_http_load_stats(pod_name: str = "curlstats", namespace: str = "default") -> str:
     """Stops and deletes the stats pod created by start_http_load_stats."""
-    return f"kubectl delete pod {pod_name} -n {namespace} --ignore-not-found"
+    return _kubectl("delete", "pod", pod_name, namespace=namespace, flags=(_IGNORE_NOT_FOUND,))
 
 
@@ -22,21 +22,30 @@ Security:
 """
 
 import asyncio
+import atexit
 import inspect
 import json
 import logging
 import os
+import queue
 import re
+import shlex
 import sys
 import time
 from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Any, Dict, Optional
 
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-from k8s_mcp_server import prompts
+try:
+    import orjson  # C JSON encoder/decoder for log records and kubectl output
+except ImportError:  # platforms without orjson wheels fall back to stdlib json
+    orjson = None
+
+from k8s_mcp_server import k8s_api, prompts
 
 
 # ============================================================================
@@ -44,10 +53,32 @@ from k8s_mcp_server import prompts
 # ============================================================================
 # Windows requires ProactorEventLoop for subprocess support
 # This is set here as a fallback, but __main__.py sets it before uvicorn starts
-if sys.platform == 'win32':
+# (checked on the live policy, so a process that already has it skips the reinstall)
+if sys.platform == 'win32' and not isinstance(asyncio.get_event_loop_policy(), asyncio.WindowsProactorEventLoopPolicy):
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 
+# ============================================================================
+# JSON HELPERS
+# ============================================================================
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize to a JSON str via orjson when available (UTF-8, no ASCII escaping)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the latter
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+class _OrjsonResponse(JSONResponse):
+    """JSONResponse rendered by orjson (fastapi's ORJSONResponse is deprecated in newer releases)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
 # ============================================================================
 # LOGGING SETUP
 # ============================================================================
@@ -56,54 +87,113 @@ logs_dir = os.path.join(os.getcwd(), "logs")
 os.makedirs(logs_dir, exist_ok=True)
 server_log_path = os.path.join(logs_dir, "mcp_server.log")
 
+class _RecordQueueHandler(QueueHandler):
+    """Enqueues records as-is so JSON formatting and file I/O run on the
+    listener thread; callers already pass freshly built (redacted) dicts."""
+
+    def prepare(self, record):
+        return record
+
 logger = logging.getLogger("k8s_mcp_server")
 logger.setLevel(logging.INFO)
+_log_queue = queue.SimpleQueue()
+_log_listener = None  # started/stopped by the app lifecycle events
 if not logger.handlers:
     handler = RotatingFileHandler(server_log_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
     # Simple JSON formatter
     class JsonFormatter(logging.Formatter):
+        # Records arrive in bursts within the same second; reuse its strftime text
+        _ts_cache = (None, "")
+
+        def formatTime(self, record, datefmt=None):
+            if datefmt:
+                return super().formatTime(record, datefmt)
+            second = int(record.created)
+            if second != self._ts_cache[0]:
+                self._ts_cache = (second, time.strftime(self.default_time_format, self.converter(record.created)))
+            return self.default_msec_format % (self._ts_cache[1], record.msecs)
+
         def format(self, record):
-            base = {
+            msg = record.msg
+            # If the message is already a dict, merge it in one literal; otherwise include under 'message'
+            if isinstance(msg, dict):
+                return _json_dumps({
+                    "timestamp": self.formatTime(record, self.datefmt),
+                    "level": record.levelname,
+                    "logger": record.name,
+                    **msg,
+                })
+            try:
+                message = str(msg)
+            except Exception:
+                message = record.getMessage()
+            return _json_dumps({
                 "timestamp": self.formatTime(record, self.datefmt),
                 "level": record.levelname,
                 "logger": record.name,
-            }
-            # If the message is already a dict, merge it; otherwise include under 'message'
-            try:
-                msg = record.msg
-                if isinstance(msg, dict):
-                    base.update(msg)
-                else:
-                    base["message"] = str(msg)
-            except Exception:
-                base["message"] = record.getMessage()
-            return json.dumps(base, ensure_ascii=False)
+                "message": message,
+            })
 
     handler.setFormatter(JsonFormatter())
-    logger.addHandler(handler)
+    _log_listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+    logger.addHandler(_RecordQueueHandler(_log_queue))
+_log_listener_running = False
+
+
+def _start_log_listener() -> None:
+    global _log_listener_running
+    if _log_listener is not None and not _log_listener_running:
+        _log_listener.start()
+        _log_listener_running = True
+
+
+def _stop_log_listener() -> None:
+    """Drain queued records into the file; safe to call more than once"""
+    global _log_listener_running
+    if _log_listener is not None and _log_listener_running:
+        _log_listener.stop()
+        _log_listener_running = False
+
 
+# Flush on interpreter exit too, in case the shutdown event never runs
+atexit.register(_stop_log_listener)
 
-app = FastAPI(title="K8s MCP Server")
+
+# Responses carry full kubectl stdout, so serialize them with orjson too
+app = FastAPI(title="K8s MCP Server", default_response_class=_OrjsonResponse if orjson is not None else JSONResponse)
 
 @app.on_event("startup")
 async def startup_event():
-    """Ensure Windows uses ProactorEventLoop for subprocess support"""
+    """Start the log listener and ensure Windows uses ProactorEventLoop for subprocess support"""
+    _start_log_listener()
+    # Only resolve the context when the optional API client can actually use it
+    if k8s_api.k8s_client is not None and await k8s_api.start(_api_binding(await _get_kube_context_info())):
+        logger.info("Kubernetes API client ready - structured reads bypass kubectl")
     if sys.platform == 'win32':
         loop = asyncio.get_event_loop()
         if not isinstance(loop, asyncio.ProactorEventLoop):
             logger.warning("Windows detected but not using ProactorEventLoop - subprocess calls may fail")
     logger.info("MCP Server startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the Kubernetes API client and flush queued log records to the file handler"""
+    await k8s_api.stop()
+    _stop_log_listener()
+
 
 # ============================================================================
 # CONSTANTS & CONFIGURATION
 # ============================================================================
 
 # Dynamic operation discovery: automatically find all prompt functions
+# (unwrapped so lru_cache-decorated builders count; imported helpers are skipped)
 PROMPT_FUNCTIONS: Dict[str, Any] = {
     name: func
-    for name, func in inspect.getmembers(prompts, inspect.isfunction)
+    for name, func in inspect.getmembers(prompts, callable)
     if not name.startswith("_")
+    and inspect.isfunction(inspect.unwrap(func))
+    and func.__module__ == prompts.__name__
 }
 
 # Security: require confirmation for cluster-modifying operations (env configurable)
@@ -118,12 +208,17 @@ MUTATING_TOKENS = (
     " kubectl autoscale ", " kubectl scale ", " kubectl set ", " kubectl rollout undo ",
     " kubectl run ",
 )
+# One alternation pass instead of a substring scan per token
+_MUTATING_RE = re.compile("|".join(map(re.escape, MUTATING_TOKENS)))
+# Command forms that support a client-side dry-run preview
+_PREVIEWABLE_RE = re.compile(r" kubectl (?:apply|create|expose|autoscale) ")
 
 # Sensitive data keys for log redaction
-SENSITIVE_KEYS = {"OPENAI_API_KEY", "api_key", "token", "password", "secret", "credential"}
+SENSITIVE_KEYS = frozenset({"OPENAI_API_KEY", "api_key", "token", "password", "secret", "credential"})
+_SENSITIVE_KEYS_LOWER = frozenset(k.lower() for k in SENSITIVE_KEYS)
 
 # Allowed resource types (security allowlist)
-ALLOWED_RESOURCE_TYPES = {
+ALLOWED_RESOURCE_TYPES = frozenset({
     # Core resources
     "pod", "pods", "deployment", "deployments", "service", "services", "svc",
     "endpoint", "endpoints", "endpointslice", "endpointslices",
@@ -138,15 +233,71 @@ ALLOWED_RESOURCE_TYPES = {
     "ingress", "ingresses",
     # Autoscaling
     "horizontalpodautoscaler", "hpa",
-}
+})
 
 # Allowed service types (security allowlist)
-ALLOWED_SERVICE_TYPES = {"ClusterIP", "NodePort", "LoadBalancer"}
+ALLOWED_SERVICE_TYPES = frozenset({"ClusterIP", "NodePort", "LoadBalancer"})
+
+# Request params validated as non-negative integers / checked for shell control characters
+_INT_FIELDS = frozenset({
+    "replicas", "min_replicas", "max_replicas", "port", "target_port", "container_port",
+    "cpu_utilization", "memory_utilization",
+})
+_NAME_FIELDS = frozenset({"pod_name", "deployment_name", "configmap_name", "resource_name", "pvc_claim_name"})
+_CPU_FIELDS = ("cpu_request", "cpu_limit")
+_MEM_FIELDS = ("memory_request", "memory_limit")
+_VALIDATED_FIELDS = _INT_FIELDS | _NAME_FIELDS | frozenset(
+    ("namespace", "resource_type", "service_type", "label_selector", *_CPU_FIELDS, *_MEM_FIELDS)
+)
+
+# Per-instruction reflection done once: signature, docstring, the name-based mutation flag
+# (the _mcp_mutating attribute is an explicit escape hatch on the prompt function) and the
+# validated params the function actually accepts - any other param fails the call with a 400
+# before anything executes, so validation can skip it. "preview" is the optional static
+# manifest renderer a builder registers with prompts._with_preview; "dict_params" are the
+# params annotated as dict (the only ones that may carry a JSON object)
+_FN_META: Dict[str, Dict[str, Any]] = {
+    name: {
+        "sig": inspect.signature(fn),
+        "doc": inspect.getdoc(fn) or "No documentation provided.",
+        "mutating": bool(getattr(fn, "_mcp_mutating", False)) or name.startswith(MUTATING_PREFIXES),
+        "validated": _VALIDATED_FIELDS.intersection(inspect.signature(fn).parameters),
+        "preview": getattr(fn, "_mcp_preview", None),
+        "dict_params": frozenset(
+            k for k, p in inspect.signature(fn).parameters.items() if p.annotation is dict
+        ),
+    }
+    for name, fn in PROMPT_FUNCTIONS.items()
+}
+
+# Upper bound on concurrently running kubectl/shell subprocesses (env configurable)
+MAX_SUBPROCESSES = max(1, int(os.getenv("MCP_MAX_SUBPROCS", "16")))
+_SUBPROC_SEM = asyncio.Semaphore(MAX_SUBPROCESSES)
+
+# Cap on captured stdout/stderr per command (e.g. `kubectl get pods -A -o json` on big clusters)
+MAX_OUTPUT_BYTES = 16 * 1024 * 1024
+_READ_CHUNK_BYTES = 64 * 1024
+_JSON_START_MATCH = re.compile(rb"\s*[\[{]").match
+_LEADING_WS_MATCH = re.compile(rb"\s*").match
+_ASCII_WS = frozenset(b" \t\n\r\x0b\x0c")
 
 # Resource quantity validation patterns
-_CPU_QTY_RE = re.compile(r"^(?:\d+(?:\.\d+)?|\d+m)$")
+_CPU_QTY_RE = re.compile(r"\d+(?:\.\d+)?|\d+m")
 _MEM_SUFFIXES = "Ki|Mi|Gi|Ti|Pi|Ei|K|M|G|T|P|E"
-_MEM_QTY_RE = re.compile(rf"^\d+(?:\.\d+)?(?:({_MEM_SUFFIXES}))?$")
+_MEM_QTY_RE = re.compile(rf"\d+(?:\.\d+)?(?:{_MEM_SUFFIXES})?")
+_MEM_MISSING_UNIT_RE = re.compile(r"\d+i")
+
+# Kubernetes DNS label (namespace, pod name, etc.), 63-char limit included
+# No nested quantifiers, so these patterns cannot backtrack catastrophically; a
+# frozenset/issuperset check measured no faster than this fullmatch on typical names
+_DNS_LABEL_RE = re.compile(r"[a-z0-9](?:[-a-z0-9]{0,61}[a-z0-9])?")
+
+# Shell control characters that could enable injection attacks (a str.translate
+# length comparison measured ~6x slower than this search on typical name-sized values)
+_DANGEROUS_SEARCH = re.compile(r"[;&|`\r\n]").search
+
+# Command forms that still need a shell (pipes, chaining, redirects, substitution, globs, %VAR%)
+_SHELL_META_SEARCH = re.compile(r"[;&|<>$`*?()%\r\n]").search
 
 
 # ============================================================================
@@ -155,47 +306,31 @@ _MEM_QTY_RE = re.compile(rf"^\d+(?:\.\d+)?(?:({_MEM_SUFFIXES}))?$")
 
 def _display_command(cmd: str) -> str:
     """Return a human-friendly command for UI, hiding Base64 PowerShell encoding details"""
-    try:
-        if "powershell -EncodedCommand" in cmd:
-            # We know our encoded scripts pipe YAML to kubectl apply -f -
-            return "[PowerShell encoded script: kubectl apply -f - (YAML embedded)]"
-        return cmd
-    except Exception:
-        return cmd
-
-# --- Basic resource quantity validation (catch common mistakes early) ---
-_CPU_QTY_RE = re.compile(r"^(?:\d+(?:\.\d+)?|\d+m)$")
-_MEM_SUFFIXES = "Ki|Mi|Gi|Ti|Pi|Ei|K|M|G|T|P|E"
-_MEM_QTY_RE = re.compile(rf"^\d+(?:\.\d+)?(?:({_MEM_SUFFIXES}))?$")
+    if "powershell -EncodedCommand" in cmd:
+        # We know our encoded scripts pipe YAML to kubectl apply -f -
+        return "[PowerShell encoded script: kubectl apply -f - (YAML embedded)]"
+    return cmd
 
 
 # ============================================================================
 # VALIDATION HELPERS
 # ============================================================================
 
+# Callers pass str(param), so these never see non-string input
+
 def _is_valid_cpu_qty(val: str) -> bool:
     """Validate CPU quantity format (e.g., '0.5', '1', '100m')"""
-    try:
-        return bool(_CPU_QTY_RE.fullmatch(str(val)))
-    except Exception:
-        return False
+    return _CPU_QTY_RE.fullmatch(val) is not None
 
 def _is_valid_mem_qty(val: str) -> bool:
     """Validate memory quantity format (e.g., '128Mi', '1Gi')"""
-    try:
-        return bool(_MEM_QTY_RE.fullmatch(str(val)))
-    except Exception:
-        return False
+    return _MEM_QTY_RE.fullmatch(val) is not None
 
 def _suggest_mem_fix(val: str) -> Optional[str]:
     """Suggest fix for common memory quantity typos (e.g., '4i' → '4Mi')"""
-    try:
-        s = str(val)
-        if re.fullmatch(r"^\d+i$", s):
-            return s[:-1] + "Mi"
-        return None
-    except Exception:
-        return None
+    if _MEM_MISSING_UNIT_RE.fullmatch(val):
+        return val[:-1] + "Mi"
+    return None
 
 
 # ============================================================================
@@ -219,54 +354,129 @@ def redact_value(val: str) -> str:
         return "***"
     return val[:4] + "***" + val[-4:]
 
+def _redact_cow(d: dict) -> dict:
+    """Copy-on-write redaction: returns d itself when nothing under it is sensitive"""
+    red = None
+    for k, v in d.items():
+        if (k if isinstance(k, str) else str(k)).lower() in _SENSITIVE_KEYS_LOWER:
+            new = redact_value(str(v))
+        elif isinstance(v, dict):
+            new = _redact_cow(v)
+        elif isinstance(v, list):
+            new = [_redact_cow(x) if isinstance(x, dict) else x for x in v]
+            if all(a is b for a, b in zip(new, v)):
+                new = v
+        else:
+            continue
+        if new is not v:
+            if red is None:
+                red = dict(d)
+            red[k] = new
+    return d if red is None else red
+
 def redact_dict(d: dict) -> dict:
     try:
-        red = {}
-        for k, v in d.items():
-            lk = str(k).lower()
-            if lk in SENSITIVE_KEYS:
-                red[k] = redact_value(str(v))
-            elif isinstance(v, dict):
-                red[k] = redact_dict(v)
-            elif isinstance(v, list):
-                red[k] = [redact_dict(x) if isinstance(x, dict) else x for x in v]
-            else:
-                red[k] = v
-        return red
+        return _redact_cow(d)
     except Exception:
         return d
 
 
+# ============================================================================
+# SUBPROCESS HELPERS
+# ============================================================================
+
+async def _spawn(cmd: str) -> asyncio.subprocess.Process:
+    """Start cmd with piped output, exec'ing plain argv commands directly and
+    falling back to the shell for encoded PowerShell and compound command forms"""
+    argv = None
+    if "powershell -EncodedCommand" not in cmd and _SHELL_META_SEARCH(cmd) is None:
+        try:
+            argv = shlex.split(cmd)
+        except ValueError:
+            argv = None
+    if argv:
+        try:
+            return await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            pass  # let the shell report the missing binary as before
+    return await asyncio.create_subprocess_shell(
+        cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+
 # ============================================================================
 # KUBECTL CONTEXT (CACHED)
 # ============================================================================
 
-_ctx_cache = {"ts": 0, "data": {"current_context": None, "default_namespace": None}}
+_ctx_cache = {"ts": 0, "key": None, "data": {"current_context": None, "default_namespace": None}}
+# Serializes refreshes so a burst of requests after expiry spawns one kubectl pair
+_ctx_lock = asyncio.Lock()
+
+_KUBE_CONTEXT_CMD = r"""kubectl config view --minify --output 'jsonpath={.current-context}{"\n"}{..namespace}'"""
+
+def _kubeconfig_key() -> tuple:
+    """(path, mtime) for each kubeconfig file, so a context switch invalidates the cache"""
+    paths = os.environ.get("KUBECONFIG") or os.path.join(os.path.expanduser("~"), ".kube", "config")
+    key = []
+    for path in paths.split(os.pathsep):
+        try:
+            key.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            key.append((path, None))
+    return tuple(key)
+
+# kubectl config subcommands that change the current context or its namespace
+_CONFIG_WRITE_MATCH = re.compile(r"kubectl config (?:use-context|set-context|set|unset|rename-context|delete-context)\b").match
+
+async def _refresh_kube_context_info() -> Dict[str, Any]:
+    """Drop the cached context and look it up again (after a kubeconfig write)"""
+    _ctx_cache["ts"] = 0
+    return await _get_kube_context_info()
+
+def _api_binding(ctx: Dict[str, Any]) -> tuple:
+    """Kubeconfig files and current context the in-process API client must be loaded for"""
+    return _kubeconfig_key(), ctx["current_context"]
+
+def _ctx_cache_fresh(now: float, key: tuple) -> bool:
+    return (
+        now - _ctx_cache["ts"] < 60
+        and _ctx_cache["key"] == key
+        and _ctx_cache["data"]["current_context"] is not None
+    )
 
 async def _get_kube_context_info() -> Dict[str, Any]:
     """Get current kubectl context with 60-second caching to reduce overhead"""
-    now = time.time()
-    if now - _ctx_cache["ts"] < 60 and _ctx_cache["data"]["current_context"] is not None:
+    key = _kubeconfig_key()
+    if _ctx_cache_fresh(time.time(), key):
         return _ctx_cache["data"]
 
-    async def run(cmd: str) -> str:
-        p = await asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        out, _ = await p.communicate()
-        return out.decode(errors="replace").strip()
+    async with _ctx_lock:
+        # Another request may have refreshed the cache while we waited
+        now = time.time()
+        if _ctx_cache_fresh(now, key):
+            return _ctx_cache["data"]
 
-    try:
-        current_context = await run("kubectl config current-context")
-    except Exception:
-        current_context = ""
-    try:
-        default_ns = await run("kubectl config view --minify --output 'jsonpath={..namespace}'")
-    except Exception:
-        default_ns = ""
+        # One kubectl call prints "<context>\n<namespace>" from the minified config.
+        # _ctx_lock already limits this to one process, so it skips _SUBPROC_SEM: a
+        # local config read must not queue behind long-running logs -f/watch commands
+        try:
+            p = await _spawn(_KUBE_CONTEXT_CMD)
+            out, _ = await p.communicate()
+            current_context, _, default_ns = out.decode(errors="replace").strip().partition("\n")
+        except Exception:
+            current_context, default_ns = "", ""
 
-    data = {"current_context": current_context or None, "default_namespace": default_ns or None}
-    _ctx_cache["data"] = data
-    _ctx_cache["ts"] = now
-    return data
+        data = {"current_context": current_context or None, "default_namespace": default_ns or None}
+        _ctx_cache["data"] = data
+        _ctx_cache["key"] = key
+        _ctx_cache["ts"] = now
+        return data
 
 
 # ============================================================================
@@ -277,37 +487,37 @@ async def _get_kube_context_info() -> Dict[str, Any]:
 
 def _is_valid_k8s_name(name: str) -> bool:
     """Validate Kubernetes DNS label format (namespace, pod name, etc.)"""
-    return bool(re.fullmatch(r"[a-z0-9]([-a-z0-9]*[a-z0-9])?", name)) and len(name) <= 63
+    return _DNS_LABEL_RE.fullmatch(name) is not None
 
 
 def _has_dangerous_chars(value: str) -> bool:
     """Check for shell control characters that could enable injection attacks"""
-    return any(ch in value for ch in [';', '&', '|', '`', '\n', '\r'])
+    return _DANGEROUS_SEARCH(value) is not None
 
 
 def _is_mutating(instruction_name: str, command: str) -> bool:
     """Determine if an instruction/command modifies cluster state"""
-    # Check function attribute escape hatch
-    try:
-        fn = PROMPT_FUNCTIONS.get(instruction_name)
-        if fn is not None and getattr(fn, "_mcp_mutating", False):
-            return True
-    except Exception:
-        pass
-    # Prefix-based heuristic
-    if any(instruction_name.startswith(prefix) for prefix in MUTATING_PREFIXES):
-        return True
-    # Command substring heuristics
-    if any(tok in command for tok in MUTATING_TOKENS):
-        return True
-    return False
+    # Precomputed name check first, then one regex pass over the command
+    meta = _FN_META.get(instruction_name)
+    return (meta is not None and meta["mutating"]) or _MUTATING_RE.search(command) is not None
 
 
 async def _validate_request_params(req: MCPRequest, params: Dict[str, Any]) -> None:
     """Validate and sanitize all request parameters. Raises HTTPException on validation errors."""
+    meta = _FN_META[req.instruction]
+
+    # Builders take scalars (bar dict-typed params); reject lists/objects up front
+    for k, v in params.items():
+        if isinstance(v, (list, dict)) and k not in meta["dict_params"]:
+            raise HTTPException(status_code=400, detail=f"Parameter '{k}' must be a single value, not a {type(v).__name__}")
+
+    # Only the validated params this instruction accepts (see _FN_META)
+    present = meta["validated"] & params.keys()
+    if not present:
+        return
     
     # Validate namespace
-    if "namespace" in params:
+    if "namespace" in present:
         ns = params["namespace"]
         if isinstance(ns, str) and ns.lower() in {"all", "*"}:
             pass  # allowed special cases
@@ -317,13 +527,13 @@ async def _validate_request_params(req: MCPRequest, params: Dict[str, Any]) -> N
             raise HTTPException(status_code=400, detail="Invalid characters in namespace")
 
     # Validate resource_type
-    if "resource_type" in params:
+    if "resource_type" in present:
         rt = str(params["resource_type"]).lower()
         if rt not in ALLOWED_RESOURCE_TYPES:
             raise HTTPException(status_code=400, detail=f"Invalid resource_type: {params['resource_type']}")
 
     # Validate service_type
-    if "service_type" in params:
+    if "service_type" in present:
         st = str(params["service_type"])
         if st not in ALLOWED_SERVICE_TYPES:
             raise HTTPException(status_code=400, detail=f"Invalid service_type: {st}")
@@ -341,28 +551,28 @@ async def _validate_request_params(req: MCPRequest, params: Dict[str, Any]) -> N
                 raise HTTPException(status_code=400, detail=f"Parameter '{key}' must be <= {max_v}")
             params_dict[key] = iv
 
-    for k in ["replicas", "min_replicas", "max_replicas", "port", "target_port", "container_port", "cpu_utilization", "memory_utilization"]:
+    for k in _INT_FIELDS & present:
         ensure_int_in(params, k, 0)
 
     # Validate name fields don't contain dangerous characters
-    for k in ["pod_name", "deployment_name", "configmap_name", "resource_name", "pvc_claim_name"]:
-        if k in params and isinstance(params[k], str) and _has_dangerous_chars(params[k]):
+    for k in _NAME_FIELDS & present:
+        if isinstance(params[k], str) and _has_dangerous_chars(params[k]):
             raise HTTPException(status_code=400, detail=f"Invalid characters in {k}")
 
     # Validate label selector
-    if "label_selector" in params and isinstance(params["label_selector"], str):
+    if "label_selector" in present and isinstance(params["label_selector"], str):
         if _has_dangerous_chars(params["label_selector"]):
             raise HTTPException(status_code=400, detail="Invalid characters in label_selector")
 
     # Validate CPU/Memory quantities
-    for k in ("cpu_request", "cpu_limit"):
-        if k in params and params[k] is not None:
+    for k in _CPU_FIELDS:
+        if k in present and params[k] is not None:
             v = str(params[k])
             if not _is_valid_cpu_qty(v):
                 raise HTTPException(status_code=400, detail=f"Invalid {k}: '{v}'. CPU must be a number (cores, e.g., 0.5 or 1) or millicores with 'm' (e.g., 100m).")
     
-    for k in ("memory_request", "memory_limit"):
-        if k in params and params[k] is not None:
+    for k in _MEM_FIELDS:
+        if k in present and params[k] is not None:
             v = str(params[k])
             if not _is_valid_mem_qty(v):
                 suggestion = _suggest_mem_fix(v)
@@ -371,21 +581,30 @@ async def _validate_request_params(req: MCPRequest, params: Dict[str, Any]) -> N
                 raise HTTPException(status_code=400, detail=f"Invalid {k}: '{v}'. Memory must be a number optionally suffixed with Ki, Mi, Gi, Ti, Pi, Ei (or decimal K, M, G...). E.g., 128Mi, 1Gi.")
 
 
-async def _execute_dry_run_preview(cmd: str, session_id: str, request_id: Optional[str], instruction: str) -> Dict[str, Any]:
-    """Execute a dry-run preview of a command. Returns result dict."""
-    preview_cmd = cmd
-    can_execute_preview = True
-    
-    if "powershell -EncodedCommand" in cmd:
-        can_execute_preview = False
-    elif " kubectl apply " in cmd:
-        preview_cmd = cmd.replace(" kubectl apply ", " kubectl apply --dry-run=client -o yaml ")
-    elif " kubectl create " in cmd or " kubectl expose " in cmd or " kubectl autoscale " in cmd:
-        preview_cmd = cmd + " --dry-run=client -o yaml"
-    else:
-        can_execute_preview = False
+def _dry_run_command(cmd: str) -> Optional[str]:
+    """Return the client-side dry-run form of a command, or None if it has no preview"""
+    if "powershell -EncodedCommand" in cmd or _PREVIEWABLE_RE.search(cmd) is None:
+        return None
+    if " kubectl apply " in cmd:
+        return cmd.replace(" kubectl apply ", " kubectl apply --dry-run=client -o yaml ")
+    return cmd + " --dry-run=client -o yaml"
+
+
+def _static_preview(instruction: str, params: Dict[str, Any]) -> Optional[str]:
+    """Return the manifest a builder renders itself, or None if only kubectl can preview it"""
+    meta = _FN_META.get(instruction)
+    if meta is None or meta["preview"] is None:
+        return None
+    bound = meta["sig"].bind(**params)
+    bound.apply_defaults()
+    return meta["preview"](*bound.args, **bound.kwargs)
+
 
-    if not can_execute_preview:
+async def _execute_dry_run_preview(cmd: str, session_id: str, request_id: Optional[str], instruction: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a dry-run preview of a command. Returns result dict."""
+    static_yaml = _static_preview(instruction, params)
+    preview_cmd = _dry_run_command(cmd) if static_yaml is None else None
+    if static_yaml is None and preview_cmd is None:
         return {
             "session_id": session_id,
             "request_id": request_id,
@@ -396,92 +615,225 @@ async def _execute_dry_run_preview(cmd: str, session_id: str, request_id: Option
             "preview_only": True,
         }
 
-    # Execute preview command
-    process = await asyncio.create_subprocess_shell(
-        preview_cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30)
-    except asyncio.TimeoutError:
-        process.kill()
-        return {
+    if static_yaml is not None:
+        # The builder already knows its manifest; no kubectl process needed
+        result = {
             "session_id": session_id,
-            "command": preview_cmd,
-            "stdout": "",
-            "stderr": "Dry-run preview timed out after 30s",
-            "returncode": -1,
-            "timed_out": True,
+            "request_id": request_id,
+            "command": cmd,
+            "display_command": _display_command(cmd),
+            "stdout": static_yaml.strip(),
+            "stderr": "",
+            "returncode": 0,
+            "dry_run": True,
         }
+    else:
+        # Execute preview command
+        async with _SUBPROC_SEM:
+            process = await _spawn(preview_cmd)
+            stdout, stderr, timed_out, truncated = await _communicate_bounded(process, 30)
+        if timed_out:
+            return {
+                "session_id": session_id,
+                "command": preview_cmd,
+                "stdout": "",
+                "stderr": "Dry-run preview timed out after 30s",
+                "returncode": -1,
+                "timed_out": True,
+            }
 
-    result = {
-        "session_id": session_id,
-        "request_id": request_id,
-        "command": preview_cmd,
-        "display_command": _display_command(preview_cmd),
-        "stdout": stdout.decode(errors='replace').strip(),
-        "stderr": stderr.decode(errors='replace').strip(),
-        "returncode": process.returncode,
-        "dry_run": True,
-    }
+        result = {
+            "session_id": session_id,
+            "request_id": request_id,
+            "command": preview_cmd,
+            "display_command": _display_command(preview_cmd),
+            "stdout": _decode_stripped(stdout),
+            "stderr": _decode_stripped(stderr),
+            "returncode": process.returncode,
+            "dry_run": True,
+        }
+        if truncated:
+            _mark_truncated(result)
     
-    logger.info(redact_dict({
-        "event": "execute_result",
-        "session_id": session_id,
-        "request_id": request_id,
-        "instruction": instruction,
-        "returncode": result["returncode"],
-        "stdout_present": bool(result["stdout"]),
-        "stderr_present": bool(result["stderr"]),
-        "dry_run": True,
-    }))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(redact_dict({
+            "event": "execute_result",
+            "session_id": session_id,
+            "request_id": request_id,
+            "instruction": instruction,
+            "returncode": result["returncode"],
+            "stdout_present": bool(result["stdout"]),
+            "stderr_present": bool(result["stderr"]),
+            "dry_run": True,
+        }))
     
     return result
 
 
-async def _execute_command(cmd: str, timeout_seconds: int) -> tuple:
-    """Execute a shell command with timeout. Returns (stdout, stderr, returncode, timed_out, duration_ms)."""
-    start_ts = time.time()
-    process = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+async def _read_bounded(stream: asyncio.StreamReader, buf: bytearray, dropped: list) -> None:
+    """Append stream output to buf up to MAX_OUTPUT_BYTES, draining the rest.
+
+    Appends to dropped when output is discarded; a list so the flag survives a
+    read cancelled by the timeout.
+    """
+    while True:
+        chunk = await stream.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        room = MAX_OUTPUT_BYTES - len(buf)
+        if room > 0:
+            buf += chunk[:room]
+        if len(chunk) > room and not dropped:
+            dropped.append(True)
+
+
+async def _communicate_bounded(process: asyncio.subprocess.Process, timeout_seconds: float) -> tuple:
+    """Collect capped stdout/stderr until exit or timeout. Returns (stdout, stderr, timed_out, truncated).
+
+    On timeout the process is killed and whatever it wrote so far is kept, so
+    follow/watch commands still return their output. The buffers are returned as
+    bytearrays rather than copied into bytes; decode() and the JSON parsers take them as-is.
+    """
+    stdout, stderr = bytearray(), bytearray()
+    dropped = []
     timed_out = False
     try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout_seconds)
+        await asyncio.wait_for(
+            asyncio.gather(_read_bounded(process.stdout, stdout, dropped), _read_bounded(process.stderr, stderr, dropped)),
+            timeout=timeout_seconds,
+        )
     except asyncio.TimeoutError:
         process.kill()
-        stdout, stderr = await process.communicate()
+        await asyncio.gather(_read_bounded(process.stdout, stdout, dropped), _read_bounded(process.stderr, stderr, dropped))
         timed_out = True
+    await process.wait()
+    return stdout, stderr, timed_out, bool(dropped)
+
 
-    duration_ms = int((time.time() - start_ts) * 1000)
-    return stdout, stderr, process.returncode, timed_out, duration_ms
+def _decode_stripped(buf: bytearray) -> str:
+    """buf.strip().decode(errors="replace"), decoding straight from a view of the buffer"""
+    # Stripping the decoded str (or the bytes) first copies a multi-MB output once more
+    start = _LEADING_WS_MATCH(buf).end()
+    end = len(buf)
+    while end > start and buf[end - 1] in _ASCII_WS:
+        end -= 1
+    return str(memoryview(buf)[start:end], "utf-8", "replace")
 
 
-def _parse_structured_output(result: Dict[str, Any], params: Dict[str, Any]) -> None:
-    """Parse JSON output and add structured summary if requested. Modifies result dict in-place."""
+async def _execute_command(cmd: str, timeout_seconds: int) -> tuple:
+    """Execute a shell command with timeout.
+
+    Returns (stdout, stderr, returncode, timed_out, duration_ms, truncated).
+    """
+    loop = asyncio.get_running_loop()
+    start_ts = loop.time()
+    process = await _spawn(cmd)
+    stdout, stderr, timed_out, truncated = await _communicate_bounded(process, timeout_seconds)
+
+    duration_ms = int((loop.time() - start_ts) * 1000)
+    return stdout, stderr, process.returncode, timed_out, duration_ms, truncated
+
+
+def _mark_truncated(result: Dict[str, Any]) -> None:
+    """Flag a result whose output hit MAX_OUTPUT_BYTES, with a note in stderr"""
+    note = f"Output exceeded {MAX_OUTPUT_BYTES // (1024 * 1024)} MiB and was truncated."
+    result["truncated"] = True
+    result["stderr"] = f"{result['stderr']}\n{note}" if result["stderr"] else note
+
+
+# --- Per-kind one-line summaries for structured output ---
+
+def _summarize_pod(obj: dict, kind: str, name: str, ns: str, age: str) -> str:
+    status = obj.get("status") or {}
+    cs = status.get("containerStatuses") or ()
+    restarts = ready_count = 0
+    for c in cs:
+        restarts += int(c.get("restartCount", 0) or 0)
+        if c.get("ready"):
+            ready_count += 1
+    pod_ip = status.get("podIP", "-")
+    node = (obj.get("spec", {}) or {}).get("nodeName", "-")
+    return f"pod/{name} ns={ns} ip={pod_ip} node={node} phase={status.get('phase', '')} ready={ready_count}/{len(cs)} restarts={restarts} age={age}"
+
+
+def _summarize_deployment(obj: dict, kind: str, name: str, ns: str, age: str) -> str:
+    spec = obj.get("spec", {})
+    status = obj.get("status", {})
+    replicas = spec.get("replicas", status.get("replicas", 0))
+    ready = status.get("readyReplicas", 0)
+    available = status.get("availableReplicas", 0)
+    updated = status.get("updatedReplicas", 0)
+    return f"deployment/{name} ns={ns} replicas={replicas} ready={ready} updated={updated} available={available} age={age}"
+
+
+def _summarize_service(obj: dict, kind: str, name: str, ns: str, age: str) -> str:
+    spec = obj.get("spec", {})
+    stype = spec.get("type", "")
+    ports = spec.get("ports", [])
+    port_str = ",".join(str(p.get("port")) for p in ports)
+    cluster_ips = []
+    if "clusterIPs" in spec and isinstance(spec["clusterIPs"], list):
+        cluster_ips = spec["clusterIPs"]
+    elif spec.get("clusterIP") and spec.get("clusterIP") != "None":
+        cluster_ips = [spec["clusterIP"]]
+    external_ips = list(spec.get("externalIPs", []) or [])
+    lb_ing = (obj.get("status", {}).get("loadBalancer", {}) or {}).get("ingress", []) or []
+    for ing in lb_ing:
+        if isinstance(ing, dict):
+            if ing.get("ip"):
+                external_ips.append(ing["ip"])
+            if ing.get("hostname"):
+                external_ips.append(ing["hostname"])
+    cip = ",".join(cluster_ips) if cluster_ips else "-"
+    eip = ",".join(external_ips) if external_ips else "-"
+    return f"service/{name} ns={ns} type={stype} clusterIP={cip} external=[{eip}] ports=[{port_str}] age={age}"
+
+
+def _summarize_default(obj: dict, kind: str, name: str, ns: str, age: str) -> str:
+    return f"{kind}/{name} ns={ns} age={age}"
+
+
+_SUMMARIZERS = {
+    "pod": _summarize_pod,
+    "deployment": _summarize_deployment,
+    "service": _summarize_service,
+}
+
+
+def _parse_structured_output(result: Dict[str, Any], params: Dict[str, Any], raw_stdout: Optional[bytes] = None) -> None:
+    """Parse JSON output and add structured summary if requested. Modifies result dict in-place.
+
+    raw_stdout, when given, is parsed directly so the decoded str is never re-encoded.
+    """
     if not (bool(params.get("structured_output")) and result["returncode"] == 0 and result["stdout"]):
         return
 
+    data = raw_stdout if raw_stdout is not None else result["stdout"].encode()
+    # Table output (NAME  READY  STATUS ...) cannot be JSON; skip the parse attempt
+    if _JSON_START_MATCH(data) is None:
+        return
+
     structured = None
     try:
-        structured = json.loads(result["stdout"])
+        structured = _json_loads(data)
     except json.JSONDecodeError:
         return
 
     if structured is None:
         return
 
+    # One clock read per response keeps ages consistent across items
+    now = datetime.now(timezone.utc)
+
     def parse_ts(ts: str) -> datetime:
+        # Python 3.11+ fromisoformat (C) accepts the trailing 'Z' itself
         try:
-            return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+            return datetime.fromisoformat(ts)
         except Exception:
-            return datetime.now(timezone.utc)
+            return now
 
     def fmt_age(dt: datetime) -> str:
-        delta = datetime.now(timezone.utc) - dt
+        delta = now - dt
         total = int(delta.total_seconds())
         days, rem = divmod(total, 86400)
         hours, rem = divmod(rem, 3600)
@@ -497,55 +849,9 @@ def _parse_structured_output(result: Dict[str, Any], params: Dict[str, Any]) ->
     def summarize_item(obj: dict) -> str:
         kind = obj.get("kind", "").lower()
         meta = obj.get("metadata", {})
-        name = meta.get("name", "")
-        ns = meta.get("namespace", "")
         created = meta.get("creationTimestamp")
         age = fmt_age(parse_ts(created)) if created else "-"
-
-        if kind == "pod":
-            status = obj.get("status", {})
-            phase = status.get("phase", "")
-            cs = status.get("containerStatuses", []) or []
-            restarts = sum(int(c.get("restartCount", 0) or 0) for c in cs)
-            ready_total = len(cs)
-            ready_count = sum(1 for c in cs if c.get("ready"))
-            pod_ip = status.get("podIP", "-")
-            node = (obj.get("spec", {}) or {}).get("nodeName", "-")
-            return f"pod/{name} ns={ns} ip={pod_ip} node={node} phase={phase} ready={ready_count}/{ready_total} restarts={restarts} age={age}"
-        
-        if kind == "deployment":
-            spec = obj.get("spec", {})
-            status = obj.get("status", {})
-            replicas = spec.get("replicas", status.get("replicas", 0))
-            ready = status.get("readyReplicas", 0)
-            available = status.get("availableReplicas", 0)
-            updated = status.get("updatedReplicas", 0)
-            return f"deployment/{name} ns={ns} replicas={replicas} ready={ready} updated={updated} available={available} age={age}"
-        
-        if kind == "service":
-            spec = obj.get("spec", {})
-            stype = spec.get("type", "")
-            ports = spec.get("ports", [])
-            port_str = ",".join(str(p.get("port")) for p in ports)
-            cluster_ips = []
-            if "clusterIPs" in spec and isinstance(spec["clusterIPs"], list):
-                cluster_ips = spec["clusterIPs"]
-            elif spec.get("clusterIP") and spec.get("clusterIP") != "None":
-                cluster_ips = [spec["clusterIP"]]
-            external_ips = list(spec.get("externalIPs", []) or [])
-            lb_ing = (obj.get("status", {}).get("loadBalancer", {}) or {}).get("ingress", []) or []
-            for ing in lb_ing:
-                if isinstance(ing, dict):
-                    if ing.get("ip"):
-                        external_ips.append(ing["ip"])
-                    if ing.get("hostname"):
-                        external_ips.append(ing["hostname"])
-            cip = ",".join(cluster_ips) if cluster_ips else "-"
-            eip = ",".join(external_ips) if external_ips else "-"
-            return f"service/{name} ns={ns} type={stype} clusterIP={cip} external=[{eip}] ports=[{port_str}] age={age}"
-        
-        # default
-        return f"{kind}/{name} ns={ns} age={age}"
+        return _SUMMARIZERS.get(kind, _summarize_default)(obj, kind, meta.get("name", ""), meta.get("namespace", ""), age)
 
     # Support both single object and list
     items = []
@@ -561,20 +867,18 @@ def _parse_structured_output(result: Dict[str, Any], params: Dict[str, Any]) ->
     result["summary"] = "\n".join(lines)
 
 
-@app.get("/mcp/instructions")
-async def get_instructions():
-    """Returns a list of available instructions with their docstrings and arguments"""
+def _build_instructions() -> Dict[str, Any]:
+    """Build the instruction catalogue (docstrings and arguments) for all prompt functions"""
     
     instructions_with_details = {}
     
-    for tool_name, tool_func in PROMPT_FUNCTIONS.items():
+    for tool_name, meta in _FN_META.items():
         
-        # --- 1. Extract Docstring (Instruction) ---
-        # Get the function's docstring, stripping whitespace
-        docstring = inspect.getdoc(tool_func) or "No documentation provided."
+        # --- 1. Docstring (Instruction), stripped by inspect.getdoc ---
+        docstring = meta["doc"]
         
-        # --- 2. Extract Function Signature (Arguments and Defaults) ---
-        signature = inspect.signature(tool_func)
+        # --- 2. Function Signature (Arguments and Defaults) ---
+        signature = meta["sig"]
         args_with_defaults = {}
         
         for name, parameter in signature.parameters.items():
@@ -596,6 +900,16 @@ async def get_instructions():
     return {"instructions": instructions_with_details}
 
 
+# Prompt signatures and docstrings are fixed at import, so serialize the catalogue once
+_INSTRUCTIONS_BODY = _json_dumps(_build_instructions()).encode()
+
+
+@app.get("/mcp/instructions")
+async def get_instructions():
+    """Returns a list of available instructions with their docstrings and arguments"""
+    return Response(content=_INSTRUCTIONS_BODY, media_type="application/json")
+
+
 @app.post("/mcp/execute")
 async def execute_mcp(req: MCPRequest, session_id: Optional[str] = Query(None)):
     """Execute an MCP instruction with validation, confirmation gates, and dry-run support"""
@@ -621,10 +935,16 @@ async def execute_mcp(req: MCPRequest, session_id: Optional[str] = Query(None)):
     # Generate kubectl command
     try:
         cmd = PROMPT_FUNCTIONS[req.instruction](**params)
-        display_cmd = _display_command(cmd)
-        
-        # Log the request
-        ctx = await _get_kube_context_info()
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters for instruction: {e}")
+    display_cmd = _display_command(cmd)
+
+    # Resolved once per request, only after the command builds (bad params never spawn the
+    # context lookup); shared by the request log, confirmation and result
+    ctx = await _get_kube_context_info()
+
+    # Log the request
+    if logger.isEnabledFor(logging.INFO):
         logger.info(redact_dict({
             "event": "execute_requested",
             "session_id": session_id,
@@ -635,24 +955,23 @@ async def execute_mcp(req: MCPRequest, session_id: Optional[str] = Query(None)):
             "generated_command": cmd,
             "context": ctx,
         }))
-    except TypeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid parameters for instruction: {e}")
 
     # Check if command is mutating and requires confirmation
     is_mutating = _is_mutating(req.instruction, cmd)
 
     if REQUIRE_CONFIRM_FOR_MUTATIONS and is_mutating and not dry_run_param and not bool(confirm_param):
         # Generate best-effort preview for user
-        preview = await _generate_confirmation_preview(cmd)
+        preview = await _generate_confirmation_preview(cmd, req.instruction, params)
         
-        logger.info(redact_dict({
-            "event": "confirmation_required",
-            "session_id": session_id,
-            "request_id": request_id,
-            "instruction": req.instruction,
-            "mutating": True,
-            "preview_supported": preview.get("supported", False),
-        }))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(redact_dict({
+                "event": "confirmation_required",
+                "session_id": session_id,
+                "request_id": request_id,
+                "instruction": req.instruction,
+                "mutating": True,
+                "preview_supported": preview.get("supported", False),
+            }))
 
         return {
             "session_id": session_id,
@@ -663,18 +982,31 @@ async def execute_mcp(req: MCPRequest, session_id: Optional[str] = Query(None)):
             "confirmation_required": True,
             "message": "This action modifies cluster state. Resubmit with confirm=true to proceed, or dry_run=true to preview only.",
             "preview": preview,
+            "context": ctx,
             "returncode": 0,
         }
 
     # Handle dry-run preview request
     if dry_run_param:
-        return await _execute_dry_run_preview(cmd, session_id, request_id, req.instruction)
+        return await _execute_dry_run_preview(cmd, session_id, request_id, req.instruction, params)
 
     # Determine timeout strategy
     timeout_seconds = _calculate_timeout(cmd, timeout_param, duration_param)
 
-    # Execute the command
-    stdout, stderr, returncode, timed_out, duration_ms = await _execute_command(cmd, timeout_seconds)
+    # Execute the command (structured reads use the in-process API client when available)
+    outcome = await k8s_api.execute_read(req.instruction, params, timeout_seconds, _api_binding(ctx))
+    subprocess_wait_ms = 0
+    if outcome is None:
+        loop = asyncio.get_running_loop()
+        wait_start = loop.time()
+        async with _SUBPROC_SEM:
+            subprocess_wait_ms = int((loop.time() - wait_start) * 1000)
+            outcome = await _execute_command(cmd, timeout_seconds)
+    stdout, stderr, returncode, timed_out, duration_ms, truncated = outcome
+
+    # use_context and friends: report the context the command left behind, not the one before it
+    if _CONFIG_WRITE_MATCH(cmd):
+        ctx = await _refresh_kube_context_info()
 
     # Build result
     result = {
@@ -682,42 +1014,42 @@ async def execute_mcp(req: MCPRequest, session_id: Optional[str] = Query(None)):
         "request_id": request_id,
         "command": cmd,
         "display_command": display_cmd,
-        "stdout": stdout.decode(errors='replace').strip(),
-        "stderr": stderr.decode(errors='replace').strip(),
+        "stdout": _decode_stripped(stdout),
+        "stderr": _decode_stripped(stderr),
         "returncode": returncode,
         "timed_out": timed_out,
         "duration_ms": duration_ms,
+        "context": ctx,
     }
+    if truncated:
+        _mark_truncated(result)
 
-    # Parse structured output if requested
-    _parse_structured_output(result, params)
-
-    # Attach context info
-    try:
-        result["context"] = await _get_kube_context_info()
-    except Exception:
-        pass
+    # Parse structured output if requested (a cut-off document can't parse)
+    if not truncated:
+        _parse_structured_output(result, params, stdout)
 
     # Log execution result
-    logger.info(redact_dict({
-        "event": "execute_result",
-        "session_id": session_id,
-        "request_id": request_id,
-        "instruction": req.instruction,
-        "returncode": result["returncode"],
-        "stdout_present": bool(result["stdout"]),
-        "stderr_present": bool(result["stderr"]),
-        "timed_out": timed_out,
-        "duration_ms": result["duration_ms"],
-        "context": result.get("context"),
-    }))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(redact_dict({
+            "event": "execute_result",
+            "session_id": session_id,
+            "request_id": request_id,
+            "instruction": req.instruction,
+            "returncode": result["returncode"],
+            "stdout_present": bool(result["stdout"]),
+            "stderr_present": bool(result["stderr"]),
+            "timed_out": timed_out,
+            "truncated": truncated,
+            "duration_ms": result["duration_ms"],
+            "subprocess_wait_ms": subprocess_wait_ms,
+            "context": result.get("context"),
+        }))
 
     return result
 
 
-async def _generate_confirmation_preview(cmd: str) -> Dict[str, Any]:
+async def _generate_confirmation_preview(cmd: str, instruction: str, params: Dict[str, Any]) -> Dict[str, Any]:
     """Generate a best-effort preview for confirmation prompts"""
-    preview_cmd = cmd
     preview = {
         "supported": False,
         "command": cmd,
@@ -726,32 +1058,28 @@ async def _generate_confirmation_preview(cmd: str) -> Dict[str, Any]:
         "returncode": 0,
     }
     
-    if "powershell -EncodedCommand" in cmd:
+    static_yaml = _static_preview(instruction, params)
+    if static_yaml is not None:
+        preview.update({"supported": True, "stdout": static_yaml.strip(), "dry_run": True})
         return preview
-    
-    if " kubectl apply " in cmd:
-        preview_cmd = cmd.replace(" kubectl apply ", " kubectl apply --dry-run=client -o yaml ")
-    elif (" kubectl create " in cmd) or (" kubectl expose " in cmd) or (" kubectl autoscale " in cmd):
-        preview_cmd = cmd + " --dry-run=client -o yaml"
-    else:
+
+    preview_cmd = _dry_run_command(cmd)
+    if preview_cmd is None:
         return preview
 
-    process = await asyncio.create_subprocess_shell(
-        preview_cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        pstdout, pstderr = await asyncio.wait_for(process.communicate(), timeout=30)
+    async with _SUBPROC_SEM:
+        process = await _spawn(preview_cmd)
+        pstdout, pstderr, timed_out, _ = await _communicate_bounded(process, 30)
+    if not timed_out:
         preview.update({
             "supported": True,
             "command": preview_cmd,
-            "stdout": pstdout.decode(errors='replace').strip(),
-            "stderr": pstderr.decode(errors='replace').strip(),
+            "stdout": _decode_stripped(pstdout),
+            "stderr": _decode_stripped(pstderr),
             "returncode": process.returncode,
             "dry_run": True,
         })
-    except asyncio.TimeoutError:
+    else:
         preview.update({
             "supported": True,
             "command": preview_cmd,
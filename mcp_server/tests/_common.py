@@ -0,0 +1,19 @@
+"""
+Helpers shared by the HTTP-level test modules.
+
+The client itself is the session-scoped fixture in conftest.py; this module holds
+the request plumbing the test modules would otherwise each redefine.
+"""
+
+import json
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+
+def execute_url(session_id):
+    return f"/mcp/execute?session_id={session_id}"
+
+
+def encode_body(instruction, params):
+    """An /mcp/execute request body, JSON-encoded once so tests can post it with content="""
+    return json.dumps({"instruction": instruction, "params": params}).encode()
@@ -0,0 +1,119 @@
+"""
+Shared pytest fixtures for the MCP server tests.
+"""
+
+import asyncio
+import shutil
+import sys
+import types
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--integration", action="store_true", default=False,
+        help="run tests marked integration (they execute real kubectl commands)",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Integration tests are opt-in so the default run never spawns kubectl"""
+    if config.getoption("--integration"):
+        return
+    skip = pytest.mark.skip(reason="needs --integration")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _event_loop_policy():
+    """Install the Windows subprocess-capable loop policy once for the whole session"""
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    yield
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run async tests and fixtures on asyncio, with one event loop for the whole session"""
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client(anyio_backend):
+    """One in-process AsyncClient for the whole session; startup/shutdown run once around it"""
+    # Imported here so prompt-only runs never build the FastAPI app
+    import httpx
+    from k8s_mcp_server.server import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            yield c
+
+
+@pytest.fixture
+def fake_kubectl(monkeypatch):
+    """Answer subprocess spawns with canned kubectl output instead of forking; yields each argv"""
+    from k8s_mcp_server import server
+
+    calls = []
+
+    class FakeProc:
+        def __init__(self, stdout):
+            self.returncode = 0
+            self.stdout = asyncio.StreamReader()
+            self.stdout.feed_data(stdout)
+            self.stdout.feed_eof()
+            self.stderr = asyncio.StreamReader()
+            self.stderr.feed_eof()
+
+        async def communicate(self):
+            return await self.stdout.read(), await self.stderr.read()
+
+        async def wait(self):
+            return self.returncode
+
+        def kill(self):
+            pass
+
+    async def fake_exec(*argv, **kwargs):
+        calls.append(argv)
+        if argv[1:3] == ("config", "view"):
+            return FakeProc(b"test-context\ndefault")
+        return FakeProc(b"NAME    READY   STATUS    RESTARTS   AGE\npod-1   1/1     Running   0          1m\n")
+
+    async def fake_shell(cmd, **kwargs):
+        return await fake_exec(*cmd.split())
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+    monkeypatch.setattr(asyncio, "create_subprocess_shell", fake_shell)
+    # Keep the fake context out of the shared cache
+    monkeypatch.setattr(server, "_ctx_cache", {"ts": 0, "key": None, "data": {"current_context": None, "default_namespace": None}})
+    yield calls
+
+
+@pytest.fixture(scope="session")
+def kubectl_available():
+    """Whether a kubectl binary is on PATH, looked up once per session"""
+    return shutil.which("kubectl") is not None
+
+
+@pytest.fixture(scope="session")
+async def instructions(client):
+    """The /mcp/instructions registry, fetched once per session (raw dict plus frozenset of names)"""
+    response = await client.get("/mcp/instructions")
+    assert response.status_code == 200
+    data = response.json()["instructions"]
+    return types.SimpleNamespace(raw=data, names=frozenset(data))
+
+
+@pytest.fixture(scope="session")
+def validated_instructions(instructions):
+    """The instructions fixture, after checking once that every entry has documentation and arguments"""
+    for name, details in instructions.raw.items():
+        assert "__doc__" in details, f"{name} missing documentation"
+        assert "arguments" in details, f"{name} missing arguments definition"
+    return instructions
@@ -0,0 +1,130 @@
+"""
+Unit tests for the optional in-process Kubernetes API read path.
+
+A fake API object stands in for kubernetes_asyncio, so these run without the
+library or a cluster.
+"""
+
+import json
+import types
+
+import pytest
+
+from ._common import JSON_HEADERS, encode_body, execute_url
+from k8s_mcp_server import k8s_api
+
+pytestmark = pytest.mark.anyio
+
+_BINDING = ((("/kube/config", 1),), "ctx-a")
+
+
+class _FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self._body = json.dumps(body).encode()
+
+    async def read(self):
+        return self._body
+
+    def release(self):
+        pass
+
+
+class _FakeCoreV1:
+    def __init__(self, status=200):
+        self.status = status
+        self.calls = []
+
+    async def list_namespaced_pod(self, namespace, **kwargs):
+        self.calls.append(("list_namespaced_pod", namespace, kwargs.get("label_selector")))
+        return _FakeResponse(self.status, {"kind": "PodList", "items": [{"metadata": {"name": "web-1"}}]})
+
+
+class _FakeApiClient:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def _bound_api(core, binding=_BINDING):
+    return {"client": _FakeApiClient(), "core": core, "binding": binding}
+
+
+async def test_structured_pod_list_is_served_as_kubectl_json(monkeypatch):
+    """Verify list items get kubectl's kind/apiVersion and the selector is forwarded"""
+    core = _FakeCoreV1()
+    monkeypatch.setattr(k8s_api, "_api", _bound_api(core))
+    params = {"resource_type": "pods", "namespace": "prod", "structured_output": True, "label_selector": "app=web"}
+
+    stdout, stderr, returncode, timed_out, _, truncated = await k8s_api.execute_read("get_resources", params, 30, _BINDING)
+
+    doc = json.loads(stdout)
+    assert returncode == 0 and not timed_out and not truncated and stderr == b""
+    assert doc["kind"] == "List"
+    assert doc["items"][0]["kind"] == "Pod"
+    assert core.calls == [("list_namespaced_pod", "prod", "app=web")]
+
+
+async def test_unmapped_or_failed_reads_fall_back_to_kubectl(monkeypatch):
+    """Verify execute_read returns None so the server runs kubectl instead"""
+    monkeypatch.setattr(k8s_api, "_api", _bound_api(_FakeCoreV1(status=403)))
+    structured = {"resource_type": "pods", "structured_output": True}
+
+    assert await k8s_api.execute_read("get_resources", structured, 30, _BINDING) is None
+    assert await k8s_api.execute_read("get_resources", {"resource_type": "pods"}, 30, _BINDING) is None
+    assert await k8s_api.execute_read("delete_pod", structured, 30, _BINDING) is None
+
+
+async def test_context_switch_reloads_the_client(monkeypatch):
+    """Verify a new context reloads the kubeconfig instead of reading from the old cluster"""
+    old_core, new_core = _FakeCoreV1(), _FakeCoreV1()
+    old_api = _bound_api(old_core)
+    loads = []
+
+    async def load_kube_config():
+        loads.append(True)
+
+    monkeypatch.setattr(k8s_api, "_api", old_api)
+    monkeypatch.setattr(k8s_api, "k8s_config", types.SimpleNamespace(load_kube_config=load_kube_config))
+    monkeypatch.setattr(k8s_api, "k8s_client", types.SimpleNamespace(
+        ApiClient=_FakeApiClient, CoreV1Api=lambda api_client: new_core, AppsV1Api=lambda api_client: None,
+    ))
+    new_binding = (_BINDING[0], "ctx-b")
+
+    outcome = await k8s_api.execute_read("get_resources", {"resource_type": "pods", "structured_output": True}, 30, new_binding)
+
+    assert outcome is not None and outcome[2] == 0
+    assert loads == [True] and old_api["client"].closed
+    assert old_core.calls == [] and new_core.calls == [("list_namespaced_pod", "default", None)]
+    assert k8s_api._api["binding"] == new_binding
+
+
+async def test_use_context_then_structured_read_skips_stale_client(client, fake_kubectl, monkeypatch):
+    """Verify a structured read after use_context never answers from the client loaded for the old context"""
+    from k8s_mcp_server import server
+
+    stale_core = _FakeCoreV1()
+    stale_api = _bound_api(stale_core, (server._kubeconfig_key(), "old-context"))
+    monkeypatch.setattr(k8s_api, "_api", stale_api)
+    # Without kubernetes_asyncio the reload fails and kubectl answers the read
+    monkeypatch.setattr(k8s_api, "k8s_client", None)
+
+    switched = await client.post(
+        execute_url("test-use-context"),
+        content=encode_body("use_context", {"context_name": "test-context", "confirm": True}),
+        headers=JSON_HEADERS,
+    )
+    assert switched.status_code == 200
+
+    response = await client.post(
+        execute_url("test-use-context"),
+        content=encode_body("get_resources", {"resource_type": "pods", "structured_output": True}),
+        headers=JSON_HEADERS,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["context"]["current_context"] == "test-context"
+    assert stale_core.calls == [] and stale_api["client"].closed
+    assert any(argv[:3] == ("kubectl", "get", "pods") for argv in fake_kubectl)
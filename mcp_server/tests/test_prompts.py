@@ -5,14 +5,32 @@ These tests verify that prompt functions build correct kubectl commands.
 They don't execute kubectl - just check the command string is correct.
 """
 
+import base64
+import functools
+import re
+
 import pytest
 from k8s_mcp_server.prompts import (
     get_resources,
     scale_deployment,
     describe_resource,
     delete_pod,
+    dns_lookup,
+    create_configmap,
+    create_deployment_apply,
+    _clear_command_caches,
 )
 
+_ALL_NS_FLAGS = ("--all-namespaces", "-A")
+_GRACE_ZERO_FLAGS = ("--grace-period=0", "--grace-period 0")
+_REPLICAS_5 = re.compile(r"(?:replicas=|--replicas )5\b")
+
+
+@functools.lru_cache(maxsize=None)
+def _ns(namespace):
+    """Compiled matcher for any of the -n / --namespace forms targeting namespace"""
+    return re.compile(rf"(?:-n |--namespace[= ]){re.escape(namespace)}\b")
+
 
 def test_get_resources_builds_correct_command():
     """Verify get_resources generates proper kubectl get command"""
@@ -26,10 +44,10 @@ def test_get_resources_builds_correct_command():
     assert "kubectl get pods" in cmd
     
     # Should target the correct namespace
-    assert "-n production" in cmd or "--namespace production" in cmd or "--namespace=production" in cmd
+    assert _ns("production").search(cmd)
     
     # Should NOT have --all-namespaces flag
-    assert "--all-namespaces" not in cmd and "-A" not in cmd
+    assert not any(flag in cmd for flag in _ALL_NS_FLAGS)
 
 
 def test_get_resources_with_all_namespaces():
@@ -39,8 +57,8 @@ def test_get_resources_with_all_namespaces():
         all_namespaces=True
     )
     
-    assert "kubectl get deployments" in cmd or "kubectl get deployment" in cmd
-    assert "--all-namespaces" in cmd or "-A" in cmd
+    assert "kubectl get deployment" in cmd  # also matches "deployments"
+    assert any(flag in cmd for flag in _ALL_NS_FLAGS)
 
 
 def test_scale_deployment_includes_replicas():
@@ -53,8 +71,8 @@ def test_scale_deployment_includes_replicas():
     
     assert "kubectl scale" in cmd
     assert "my-app" in cmd
-    assert "replicas=5" in cmd or "--replicas=5" in cmd or "--replicas 5" in cmd
-    assert "-n staging" in cmd or "--namespace staging" in cmd or "--namespace=staging" in cmd
+    assert _REPLICAS_5.search(cmd)
+    assert _ns("staging").search(cmd)
 
 
 def test_describe_resource_command():
@@ -68,34 +86,78 @@ def test_describe_resource_command():
     assert "kubectl describe" in cmd
     assert "pod" in cmd
     assert "test-pod-123" in cmd
-    assert "-n default" in cmd or "--namespace default" in cmd or "--namespace=default" in cmd
+    assert _ns("default").search(cmd)
 
 
-def test_delete_pod_command():
-    """Verify delete pod command is built correctly"""
-    cmd = delete_pod(
-        pod_name="old-pod",
-        namespace="default",
-        ignore_not_found=True,
-        wait=False
-    )
-    
-    assert "kubectl delete pod" in cmd
-    assert "old-pod" in cmd
-    assert "--ignore-not-found" in cmd
-    assert "-n default" in cmd or "--namespace default" in cmd or "--namespace=default" in cmd
-
-
-def test_delete_pod_with_force():
-    """Verify force delete includes grace period and force flags"""
-    cmd = delete_pod(
-        pod_name="stuck-pod",
-        namespace="default",
-        force=True,
-        grace_period=0
+@pytest.mark.parametrize("kwargs, must_contain", [
+    # Plain delete
+    (dict(pod_name="old-pod", namespace="default", ignore_not_found=True, wait=False),
+     ("kubectl delete pod", "old-pod", "--ignore-not-found")),
+    # Force delete includes grace period and force flags
+    (dict(pod_name="stuck-pod", namespace="default", force=True, grace_period=0),
+     ("kubectl delete pod", "stuck-pod", "--force", _GRACE_ZERO_FLAGS)),
+], ids=["plain", "force"])
+def test_delete_pod_command(kwargs, must_contain):
+    """Verify delete pod command is built correctly; a tuple entry lists accepted alternatives"""
+    cmd = delete_pod(**kwargs)
+
+    for frag in must_contain:
+        alternatives = (frag,) if isinstance(frag, str) else frag
+        assert any(alt in cmd for alt in alternatives), frag
+    assert _ns(kwargs["namespace"]).search(cmd)
+
+
+def test_replace_existing_deletes_with_default_grace_period():
+    """Verify the replace_existing prefix is a plain waiting delete (no --grace-period/--wait flags)"""
+    cmd = dns_lookup("web.default.svc", namespace="default", replace_existing=True)
+
+    assert cmd.startswith("kubectl delete pod dnscheck -n default --ignore-not-found; kubectl run dnscheck ")
+
+
+def test_cached_builder_returns_same_command():
+    """Verify memoized builders return identical commands until the caches are cleared"""
+    first = delete_pod(pod_name="cache-pod", namespace="default")
+    assert delete_pod(pod_name="cache-pod", namespace="default") is first
+
+    _clear_command_caches()
+    assert delete_pod.cache_info().currsize == 0
+    assert delete_pod(pod_name="cache-pod", namespace="default") == first
+
+
+def test_cached_builder_accepts_unhashable_params():
+    """Verify unhashable args (list values in configmap data) bypass the cache instead of failing"""
+    cmd = create_configmap("app-config", namespace="default", data={"keys": ["a", "b"]})
+    assert cmd.startswith("powershell -EncodedCommand ")
+
+
+def test_create_configmap_accepts_dict_data():
+    """Verify the dict argument is converted before hitting the cached builder"""
+    cmd = create_configmap("app-config", namespace="default", data={"b": "2", "a": "1"})
+
+    assert cmd.startswith("powershell -EncodedCommand ")
+    assert cmd == create_configmap("app-config", namespace="default", data={"a": "1", "b": "2"})
+
+
+def test_deployment_apply_nests_volume_blocks():
+    """Verify the PVC volume and mount land inside the pod spec of the encoded manifest"""
+    cmd = create_deployment_apply(
+        deployment_name="web",
+        image="nginx",
+        volume_mount_path="/data",
+        pvc_claim_name="web-data",
     )
-    
-    assert "kubectl delete pod" in cmd
-    assert "stuck-pod" in cmd
-    assert "--force" in cmd
-    assert "--grace-period=0" in cmd or "--grace-period 0" in cmd
+    script = base64.b64decode(cmd.split()[-1]).decode("utf-16-le")
+
+    assert "\nkind: Deployment\n" in script
+    assert "        volumeMounts:\n        - name: app-storage\n          mountPath: /data\n" in script
+    assert "      volumes:\n      - name: app-storage\n" in script
+    assert "          claimName: web-data" in script
+    assert script.endswith("\n'@\nWrite-Output $yaml | kubectl apply --wait=false -f -\n")
+
+
+def test_create_configmap_quotes_literals_for_powershell():
+    """Verify each key=value literal is single-quoted with embedded quotes doubled"""
+    cmd = create_configmap("app-config", namespace="default", data={"msg": "it's ok"})
+    script = base64.b64decode(cmd.split()[-1]).decode("utf-16-le")
+
+    assert "--from-literal='msg=it''s ok'" in script
@@ -7,17 +7,18 @@ These tests verify:
 - Instructions are properly registered
 """
 
+import asyncio
+import time
+
+import anyio
 import pytest
-from fastapi.testclient import TestClient
-from k8s_mcp_server.server import app
 
-# Create a test client (doesn't require actual server to be running)
-client = TestClient(app)
+pytestmark = pytest.mark.anyio
 
 
-def test_root_endpoint_responds():
+async def test_root_endpoint_responds(client):
     """Verify server health check endpoint is working"""
-    response = client.get("/")
+    response = await client.get("/")
     
     assert response.status_code == 200
     data = response.json()
@@ -25,33 +26,22 @@ def test_root_endpoint_responds():
     assert "K8s MCP Server" in data["message"]
 
 
-def test_instructions_endpoint_returns_commands():
-    """Verify instructions endpoint lists available kubectl operations"""
-    response = client.get("/mcp/instructions")
-    
-    assert response.status_code == 200
-    data = response.json()
-    
-    # Should have an instructions key
-    assert "instructions" in data
-    instructions = data["instructions"]
-    
+async def test_instructions_endpoint_returns_commands(validated_instructions):
+    """Verify instructions endpoint lists documented kubectl operations"""
+    names = validated_instructions.names
+
     # Should have multiple commands available
-    assert len(instructions) > 0
+    assert len(names) > 0
     
     # Verify some expected commands are present
-    assert "get_resources" in instructions
-    assert "create_deployment_apply" in instructions
-    
-    # Each instruction should have documentation and arguments
-    for name, details in instructions.items():
-        assert "__doc__" in details, f"{name} missing documentation"
-        assert "arguments" in details, f"{name} missing arguments definition"
+    assert "get_resources" in names
+    assert "create_deployment_apply" in names
+    assert "delete_pod" in names  # memoized builders are discovered too
 
 
-def test_missing_session_id_rejected():
+async def test_missing_session_id_rejected(client):
     """Verify requests without session_id are rejected"""
-    response = client.post(
+    response = await client.post(
         "/mcp/execute",  # Missing ?session_id=xxx
         json={
             "instruction": "get_resources",
@@ -61,3 +51,101 @@ def test_missing_session_id_rejected():
     
     assert response.status_code == 400
     assert "session_id is required" in response.json()["detail"]
+
+
+async def test_structured_output_parses_kubectl_json(client, monkeypatch):
+    """Verify structured_output decodes kubectl's JSON alongside the text stdout"""
+    from k8s_mcp_server import server
+
+    async def fake_execute(cmd, timeout_seconds):
+        return b'{"kind": "List", "items": []}\n', b"", 0, False, 1, False
+
+    monkeypatch.setattr(server, "_execute_command", fake_execute)
+    response = await client.post(
+        "/mcp/execute?session_id=test-structured",
+        json={
+            "instruction": "get_resources",
+            "params": {"resource_type": "pods", "structured_output": True}
+        }
+    )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["structured"] == {"kind": "List", "items": []}
+    assert data["stdout"] == '{"kind": "List", "items": []}'
+
+
+async def test_deployment_dry_run_uses_static_manifest(client, monkeypatch):
+    """Verify create_deployment_apply previews its own manifest without spawning kubectl"""
+    from k8s_mcp_server import server
+
+    async def no_spawn(cmd):
+        raise AssertionError(f"unexpected subprocess: {cmd}")
+
+    monkeypatch.setattr(server, "_spawn", no_spawn)
+    monkeypatch.setattr(server, "_ctx_cache", {"ts": float("inf"), "key": server._kubeconfig_key(),
+                                               "data": {"current_context": "test", "default_namespace": None}})
+    response = await client.post(
+        "/mcp/execute?session_id=test-preview",
+        json={
+            "instruction": "create_deployment_apply",
+            "params": {"deployment_name": "web", "image": "nginx", "dry_run": True}
+        }
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["dry_run"] is True and data["returncode"] == 0
+    assert "kind: Deployment" in data["stdout"]
+    assert "image: nginx" in data["stdout"]
+
+
+async def test_oversized_output_is_flagged_truncated(client, fake_kubectl, monkeypatch):
+    """Verify output past MAX_OUTPUT_BYTES is cut with truncated=True and a note instead of silently"""
+    from k8s_mcp_server import server
+
+    monkeypatch.setattr(server, "MAX_OUTPUT_BYTES", 16)
+    response = await client.post(
+        "/mcp/execute?session_id=test-truncated",
+        json={"instruction": "get_resources", "params": {"resource_type": "pods"}}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["truncated"] is True
+    assert len(data["stdout"]) <= 16
+    assert "truncated" in data["stderr"]
+
+
+async def test_context_lookup_does_not_wait_for_subprocess_slots(fake_kubectl, monkeypatch):
+    """Verify the kube-context lookup still answers while every subprocess slot is taken"""
+    from k8s_mcp_server import server
+
+    full = asyncio.Semaphore(1)
+    await full.acquire()
+    monkeypatch.setattr(server, "_SUBPROC_SEM", full)
+
+    with anyio.fail_after(1):
+        ctx = await server._get_kube_context_info()
+
+    assert ctx["current_context"] == "test-context"
+
+
+async def test_use_context_reports_the_new_context(client, fake_kubectl):
+    """Verify the result of use_context carries the context after the switch, not the cached one before it"""
+    from k8s_mcp_server import server
+
+    server._ctx_cache.update(
+        ts=time.time(), key=server._kubeconfig_key(),
+        data={"current_context": "old-context", "default_namespace": "default"},
+    )
+    response = await client.post(
+        "/mcp/execute?session_id=test-use-context",
+        json={"instruction": "use_context", "params": {"context_name": "test-context", "confirm": True}}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["returncode"] == 0
+    assert data["context"]["current_context"] == "test-context"
+    assert any(argv[1:3] == ("config", "use-context") for argv in fake_kubectl)
@@ -8,122 +8,86 @@ These tests verify that the server properly validates and rejects:
 """
 
 import pytest
-from fastapi.testclient import TestClient
-from k8s_mcp_server.server import app
-
-client = TestClient(app)
-
-
-def test_invalid_namespace_with_underscore_rejected():
-    """
-    Namespaces must follow DNS label rules: lowercase alphanumeric and hyphens only.
-    Underscores and other special chars should be rejected to prevent injection.
-    """
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "get_resources",
-            "params": {
-                "resource_type": "pods",
-                "namespace": "invalid_namespace_name"  # Underscore is invalid!
-            }
-        }
-    )
-    
-    assert response.status_code == 400
-    assert "Invalid namespace" in response.json()["detail"]
-
-
-def test_invalid_namespace_with_special_chars_rejected():
-    """Verify special characters in namespace are rejected"""
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "get_resources",
-            "params": {
-                "resource_type": "pods",
-                "namespace": "namespace;rm -rf /"  # Injection attempt!
-            }
-        }
-    )
-    
-    assert response.status_code == 400
-    assert "Invalid" in response.json()["detail"]
-
-
-def test_invalid_resource_type_rejected():
-    """
-    Only allowlisted resource types should be accepted.
-    This prevents arbitrary kubectl commands.
-    """
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "get_resources",
-            "params": {
-                "resource_type": "malicious-resource-type",
-                "namespace": "default"
-            }
-        }
-    )
-    
-    assert response.status_code == 400
-    assert "Invalid resource_type" in response.json()["detail"]
-
-
-def test_invalid_memory_quantity_rejected():
-    """
-    Memory quantities must have valid units (Ki, Mi, Gi, etc.)
-    Common typo "4i" should be caught with helpful suggestion.
-    """
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "create_deployment_apply",
-            "params": {
-                "deployment_name": "test-deployment",
-                "image": "nginx",
-                "namespace": "default",
-                "memory_limit": "4i"  # Invalid! Should be "4Mi"
-            }
-        }
-    )
-    
-    assert response.status_code == 400
-    detail = response.json()["detail"]
-    assert "Invalid memory_limit" in detail
-    # Server should suggest the fix
-    assert "4Mi" in detail or "Did you mean" in detail
-
-
-def test_invalid_cpu_quantity_rejected():
-    """CPU must be a number (cores) or millicores with 'm' suffix"""
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "create_deployment_apply",
-            "params": {
-                "deployment_name": "test-deployment",
-                "image": "nginx",
-                "namespace": "default",
-                "cpu_limit": "invalid-cpu"
-            }
-        }
-    )
-    
-    assert response.status_code == 400
-    assert "Invalid cpu_limit" in response.json()["detail"]
-
-
-def test_unknown_instruction_rejected():
-    """Verify requests for non-existent instructions are rejected"""
-    response = client.post(
-        "/mcp/execute?session_id=test-validation",
-        json={
-            "instruction": "hack_the_planet",
-            "params": {}
-        }
-    )
-    
-    assert response.status_code == 400
-    assert "Unknown instruction" in response.json()["detail"]
+
+from ._common import JSON_HEADERS, encode_body, execute_url
+
+pytestmark = pytest.mark.anyio
+
+_EXECUTE_URL = execute_url("test-validation")
+_DEPLOY_PARAMS = {"deployment_name": "test-deployment", "image": "nginx", "namespace": "default"}
+
+
+# Request bodies are encoded once at collection and posted as raw bytes
+def _get_res_body(params):
+    return encode_body("get_resources", params)
+
+
+def _deploy_body(overrides):
+    return encode_body("create_deployment_apply", {**_DEPLOY_PARAMS, **overrides})
+
+
+_UNKNOWN_INSTRUCTION_BODY = encode_body("hack_the_planet", {})
+
+
+class TestValidation:
+    """Rejected requests; every case posts to the same execute URL with the shared client"""
+
+    @pytest.fixture(autouse=True)
+    def _bind_client(self, client):
+        self.client = client
+
+    @pytest.mark.parametrize("body, expected", [
+        # Namespaces must follow DNS label rules: underscores and other special chars are
+        # rejected to prevent injection
+        (_get_res_body({"resource_type": "pods", "namespace": "invalid_namespace_name"}), ("Invalid namespace",)),
+        (_get_res_body({"resource_type": "pods", "namespace": "namespace;rm -rf /"}), ("Invalid",)),
+        # Only allowlisted resource types are accepted, preventing arbitrary kubectl commands
+        (_get_res_body({"resource_type": "malicious-resource-type", "namespace": "default"}), ("Invalid resource_type",)),
+    ], ids=["namespace-underscore", "namespace-injection", "resource-type"])
+    async def test_get_resources_rejects_invalid_params(self, body, expected):
+        """Verify invalid namespaces and resource types are rejected with a 400"""
+        response = await self.client.post(_EXECUTE_URL, content=body, headers=JSON_HEADERS)
+
+        assert response.status_code == 400
+        detail = response.json()["detail"]
+        for substr in expected:
+            assert substr in detail
+
+    @pytest.mark.parametrize("body, expected", [
+        # Common typo "4i" is caught, and the server suggests the fix ("4Mi")
+        (_deploy_body({"memory_limit": "4i"}), ("Invalid memory_limit", "4Mi")),
+        # CPU must be a number (cores) or millicores with 'm' suffix
+        (_deploy_body({"cpu_limit": "invalid-cpu"}), ("Invalid cpu_limit",)),
+    ], ids=["memory-missing-unit", "cpu"])
+    async def test_deployment_rejects_invalid_quantities(self, body, expected):
+        """Verify malformed CPU/memory quantities are rejected with a 400"""
+        response = await self.client.post(_EXECUTE_URL, content=body, headers=JSON_HEADERS)
+
+        assert response.status_code == 400
+        detail = response.json()["detail"]
+        for substr in expected:
+            assert substr in detail
+
+    async def test_non_scalar_param_rejected(self):
+        """Verify a list where a builder expects a single value gets a clear 400"""
+        body = encode_body("get_pod_logs", {"pod_name": "p", "container": ["a"]})
+        response = await self.client.post(_EXECUTE_URL, content=body, headers=JSON_HEADERS)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Parameter 'container' must be a single value, not a list"
+
+    async def test_unknown_instruction_rejected(self):
+        """Verify requests for non-existent instructions are rejected"""
+        response = await self.client.post(_EXECUTE_URL, content=_UNKNOWN_INSTRUCTION_BODY, headers=JSON_HEADERS)
+
+        assert response.status_code == 400
+        assert "Unknown instruction" in response.json()["detail"]
+
+    async def test_bad_builder_params_rejected_before_context_lookup(self, fake_kubectl):
+        """Verify params the builder rejects get a 400 without spawning the context lookup"""
+        body = encode_body("get_pod_logs", {"pod_nmae": "p"})
+        response = await self.client.post(_EXECUTE_URL, content=body, headers=JSON_HEADERS)
+
+        assert response.status_code == 400
+        assert "Invalid parameters for instruction" in response.json()["detail"]
+        assert fake_kubectl == []